@@ -0,0 +1,242 @@
+"""
+Memory and allocation benchmark for tinymarkup’s small value types on
+a large multi-language document.
+
+Run from the repository’s root:
+
+    python benchmarks/tsearch_memory.py [words]
+
+The current Language, Write_setweight, Write_tsvector and
+CompilerDuplexer.MethodProxy are compared against copies of their
+dict-backed versions from before they got __slots__, an immutable
+Language with a cached hash and per-name MethodProxy objects.
+"""
+import sys, time, timeit, tracemalloc, random, dataclasses
+
+sys.path.insert(0, ".")
+
+from tinymarkup.language import Language
+from tinymarkup.writer import TSearchWriter, Write_setweight, Write_tsvector
+from tinymarkup.compiler import CompilerDuplexer
+
+## The dict-backed versions.
+@dataclasses.dataclass
+class OldLanguage(object):
+    iso: str
+    tsearch_configuration: str
+
+    @property
+    def config_string(self):
+        return f"{self.iso}:{self.tsearch_configuration}"
+
+    def __hash__(self):
+        return hash(self.config_string)
+
+class OldWrite_setweight(object):
+    created = 0
+
+    def __init__(self, writer, weight):
+        OldWrite_setweight.created += 1
+        self.output = writer.output
+
+        weight = weight.upper()
+        assert len(weight) == 1 and weight in "ABCD", ValueError
+        self._weight = weight
+
+        self._to_tsvector_writer = None
+        self._started = False
+
+    write = Write_setweight.write
+    finish = Write_setweight.finish
+    tsvector_writer = Write_setweight.tsvector_writer
+    weight = Write_setweight.weight
+    language = Write_setweight.language
+
+class OldWrite_tsvector(object):
+    created = 0
+
+    def __init__(self, writer, language):
+        OldWrite_tsvector.created += 1
+        self.output = writer.output
+        self._language = language
+        self._started = False
+
+    write = Write_tsvector.write
+    finish = Write_tsvector.finish
+    language = Write_tsvector.language
+
+class OldTSearchWriter(TSearchWriter):
+    def write(self, text, language=None, weight="D"):
+        if ( self.setweight_writer is not None
+             and self.setweight_writer.weight != weight):
+            self.setweight_writer.finish()
+            self.setweight_writer = None
+
+        if self.setweight_writer is None:
+            self.setweight_writer = OldWrite_setweight(self, weight)
+
+        if language is None:
+            language = self.root_language
+
+        if self.setweight_writer.language != language:
+            self.setweight_writer.tsvector_writer = OldWrite_tsvector(
+                self, language)
+
+        self.setweight_writer.write(text, self._started)
+        self._started = True
+
+    def tsvector_break(self):
+        if self.setweight_writer is not None:
+            self.setweight_writer.tsvector_writer = OldWrite_tsvector(
+                self, self.setweight_writer.language)
+
+class OldCompilerDuplexer(object):
+    def __init__(self, *compilers):
+        self._compilers = [ c for c in compilers if c is not None ]
+
+    def __getattr__(self, name):
+        return self.MethodProxy(self._compilers, name)
+
+    @dataclasses.dataclass
+    class MethodProxy(object):
+        compilers: list
+        method_name: str
+
+        def __call__(self, *args, **kw):
+            for compiler in self.compilers:
+                method = getattr(compiler, self.method_name)
+                method(*args, **kw)
+
+## Helpers.
+class Discard(object):
+    """
+    Output that keeps nothing, so only the writer’s own allocations
+    show up in the measurements.
+    """
+    def write(self, s):
+        return len(s)
+
+class Compiler(object):
+    def word(self, s):
+        pass
+
+specs = ( ("en", "english"), ("de", "german"),
+          ("fr", "french"), ("nl", "dutch"), )
+
+def document(words, language_class):
+    """
+    Yield ( word, language, weight, ) tuples that switch language every
+    few words and weight every few dozen, much like a glossary would.
+    Languages come from a registry, like the Context’s.
+    """
+    rnd = random.Random(42)
+    langs = [ language_class(*spec) for spec in specs ]
+    language, weight = langs[0], "D"
+    for idx in range(words):
+        if idx % 7 == 0:
+            language = rnd.choice(langs)
+        if idx % 50 == 0:
+            weight = rnd.choice("ABCD")
+        yield ( f"word{idx % 997}", language, weight, )
+
+def instance_size(factory):
+    """
+    Average number of bytes allocated per object created by `factory`.
+    """
+    count = 10000
+    tracemalloc.start()
+    before, peak = tracemalloc.get_traced_memory()
+    instances = [ factory() for a in range(count) ]
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Don’t count the list itself.
+    return ( after - before - sys.getsizeof(instances) ) / count
+
+def run_document(words, writer_class, language_class):
+    items = list(document(words, language_class))
+    writer = writer_class(Discard(), items[0][1])
+
+    start = time.perf_counter()
+    for word, language, weight in items:
+        writer.write(word, language, weight)
+        if ( hash(word) & 0x3f ) == 0:
+            writer.tsvector_break()
+    writer.end_document()
+
+    return time.perf_counter() - start
+
+def main():
+    words = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    writer = TSearchWriter(Discard(), Language("en", "english"))
+    old_writer = OldTSearchWriter(Discard(), OldLanguage("en", "english"))
+
+    print("Bytes allocated per instance:         now    before")
+    for name, new, old in (
+            ( "Language",
+              lambda: Language("en", "english"),
+              lambda: OldLanguage("en", "english"), ),
+            ( "Write_setweight",
+              lambda: Write_setweight(writer, "A"),
+              lambda: OldWrite_setweight(old_writer, "A"), ),
+            ( "Write_tsvector",
+              lambda: Write_tsvector(writer, writer.root_language),
+              lambda: OldWrite_tsvector(old_writer,
+                                        old_writer.root_language), ),
+            ( "MethodProxy",
+              lambda: CompilerDuplexer.MethodProxy((), "word"),
+              lambda: OldCompilerDuplexer.MethodProxy([], "word"), ), ):
+        print("  %-32s %7.1f %9.1f" % ( name,
+                                         instance_size(new),
+                                         instance_size(old), ))
+
+    print()
+    print("Seconds for 1,000,000 operations:     now    before")
+    new_a, new_b = Language("en", "english"), Language("en", "english")
+    old_a, old_b = OldLanguage("en", "english"), OldLanguage("en", "english")
+    for name, new, old in (
+            ( "hash(Language)",
+              lambda: hash(new_a), lambda: hash(old_a), ),
+            ( "Language == equal Language",
+              lambda: new_a == new_b, lambda: old_a == old_b, ),
+            ( "Language != same Language",
+              lambda: new_a != new_a, lambda: old_a != old_a, ), ):
+        print("  %-32s %7.3f %9.3f" % ( name,
+                                         timeit.timeit(new, number=1000000),
+                                         timeit.timeit(old, number=1000000),))
+
+    compilers = ( Compiler(), Compiler(), )
+    duplexer = CompilerDuplexer(*compilers)
+    old_duplexer = OldCompilerDuplexer(*compilers)
+    print("  %-32s %7.3f %9.3f" % (
+        "CompilerDuplexer.word(s)",
+        timeit.timeit(lambda: duplexer.word("s"), number=1000000),
+        timeit.timeit(lambda: old_duplexer.word("s"), number=1000000), ))
+
+    print()
+    print(f"TSearchWriter, {words} words in {len(specs)} languages:")
+    OldWrite_setweight.created = OldWrite_tsvector.created = 0
+    old_seconds = run_document(words, OldTSearchWriter, OldLanguage)
+    new_seconds = run_document(words, TSearchWriter, Language)
+
+    # Both versions create the same number of writer objects.
+    setweights = OldWrite_setweight.created
+    tsvectors = OldWrite_tsvector.created
+
+    new_bytes = (
+        setweights * instance_size(lambda: Write_setweight(writer, "A"))
+        + tsvectors * instance_size(lambda: Write_tsvector(
+            writer, writer.root_language)) )
+    old_bytes = (
+        setweights * instance_size(lambda: OldWrite_setweight(
+            old_writer, "A"))
+        + tsvectors * instance_size(lambda: OldWrite_tsvector(
+            old_writer, old_writer.root_language)) )
+
+    print(f"  {setweights} Write_setweight and "
+          f"{tsvectors} Write_tsvector objects created.")
+    print("  %-32s %7.3f %9.3f" % ( "Seconds", new_seconds, old_seconds, ))
+    print("  %-32s %7d %9d" % ( "Bytes allocated for them",
+                                new_bytes, old_bytes, ))
+
+if __name__ == "__main__":
+    main()
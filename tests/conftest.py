@@ -0,0 +1,7 @@
+"""
+Make tinymarkup importable when the tests are run with plain pytest
+from a source checkout, which isn’t installed as a package.
+"""
+import sys, pathlib
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
@@ -0,0 +1,85 @@
+import threading, concurrent.futures
+
+import pytest
+
+from tinymarkup.budget import Budget
+from tinymarkup.exceptions import BudgetExceeded
+from tinymarkup.parallel import compile_parallel
+from tinymarkup.incremental import IncrementalResult
+
+from toymarkup import make_context, compile_html, every_break
+
+def test_token_limit():
+    context = make_context()
+    context.budget = Budget(max_tokens=5)
+
+    assert compile_html(context, "a b c") == "<p>a b c</p>\n"
+    with pytest.raises(BudgetExceeded) as info:
+        compile_html(context, "a b\nc d e f")
+    assert info.value.lineno == 2
+
+def test_output_limit_applies_to_every_writer():
+    context = make_context()
+    context.budget = Budget(max_output=20)
+
+    with pytest.raises(BudgetExceeded):
+        compile_html(context, "word " * 10)
+
+def test_concurrent_compiles_count_separately():
+    # Eight documents of ten tokens each, compiled at the same time
+    # with the same Context. A shared count would exceed the budget.
+    context = make_context()
+    context.budget = Budget(max_tokens=10)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def compile():
+        barrier.wait()
+        results.append(compile_html(context, "a b c d e "))
+
+    threads = [ threading.Thread(target=compile) for a in range(8) ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8
+
+def toy_compile(context, source):
+    return compile_html(context, source)
+
+def test_chunks_share_the_document_budget():
+    source = "a b\n\nc d\n\ne f\n\ng h"
+    context = make_context()
+    expected = compile_html(context, source)
+
+    # Four chunks of three tokens each.
+    context.budget = Budget(max_tokens=12)
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        assert compile_parallel(toy_compile, context, source,
+                                min_chunk_size=0, is_safe_break=every_break,
+                                executor=executor) == expected
+
+    context.budget = Budget(max_tokens=11)
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        with pytest.raises(BudgetExceeded):
+            compile_parallel(toy_compile, context, source, min_chunk_size=0,
+                             is_safe_break=every_break, executor=executor)
+
+    with pytest.raises(BudgetExceeded):
+        IncrementalResult(toy_compile, context, source, every_break)
+
+def test_incremental_edit_checks_the_whole_document():
+    context = make_context()
+    # Three chunks of three tokens each.
+    context.budget = Budget(max_tokens=11)
+    result = IncrementalResult(toy_compile, context,
+                               "a b\n\nc d\n\ne f", every_break)
+
+    result = result.edit(0, 0, "x ")
+    context.budget = None
+    assert result.output == compile_html(context, result.source)
+    context.budget = Budget(max_tokens=11)
+
+    with pytest.raises(BudgetExceeded):
+        result.edit(0, 0, "y z ")
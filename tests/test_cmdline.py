@@ -0,0 +1,119 @@
+import io, sys, gzip, zlib
+
+import pytest
+
+from toymarkup import make_tool, ToyTool
+
+class CheckOnlyTool(ToyTool):
+    def to_html(self, outfile, source):
+        raise AssertionError("--check must not build HTML.")
+
+def test_check_reports_every_failing_file(tmp_path, monkeypatch, capsys):
+    paths = []
+    for name, source in ( ( "good.txt", "Fine <<now>>." ),
+                          ( "macro.txt", "Bad\n<<nope>>" ),
+                          ( "language.txt", "{xx:unknown}" ), ):
+        path = tmp_path / name
+        path.write_text(source)
+        paths.append(str(path))
+
+    outfile = tmp_path / "out.html"
+    outfile.write_text("keep me")
+
+    tool = make_tool(monkeypatch, "--check", "-o", str(outfile), *paths,
+                     tool_class=CheckOnlyTool)
+    with pytest.raises(SystemExit) as info:
+        tool()
+    assert info.value.code == 1
+
+    stderr = capsys.readouterr().err
+    assert "good.txt" not in stderr
+    assert "macro.txt: Macro named “nope” not found." in stderr
+    assert "language.txt: Unknown language" in stderr
+    assert "2 of 3 file(s) failed." in stderr
+
+    # The output file was left alone.
+    assert outfile.read_text() == "keep me"
+
+def test_check_passes(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "good.txt"
+    path.write_text("Fine <<now>>.")
+
+    make_tool(monkeypatch, "--check", str(path), tool_class=CheckOnlyTool)()
+    assert capsys.readouterr().err == ""
+
+@pytest.mark.parametrize("layout, expected", [
+    ( "default",
+      '<!DOCTYPE html>\n<html>\n<head>\n<title></title>\n'
+      '<meta charset="utf-8">\n</head>\n<body>\n'
+      '<p>Hello</p>\n'
+      '</body>\n</html>\n', ),
+    ( "compact",
+      '<!DOCTYPE html><html><head><title></title>'
+      '<meta charset="utf-8"></head><body>'
+      '<p>Hello</p>'
+      '</body></html>', ), ])
+def test_build_layout(tmp_path, monkeypatch, layout, expected):
+    path = tmp_path / "in.txt"
+    path.write_text("Hello")
+    outfile = tmp_path / "out.html"
+
+    make_tool(monkeypatch, "--layout", layout, "-o", str(outfile),
+              str(path))()
+    assert outfile.read_text() == expected
+
+def test_outfile_is_opened_on_first_write(tmp_path, monkeypatch):
+    outfile = tmp_path / "out.html"
+    tool = make_tool(monkeypatch, "-o", str(outfile), "in.txt")
+
+    assert not outfile.exists()
+    print("Hello", file=tool.args.outfile)
+    tool.args.outfile.close()
+    assert outfile.read_text() == "Hello\n"
+
+@pytest.mark.parametrize("format, suffix, decompress", [
+    ( "gzip", ".gz", gzip.decompress, ),
+    ( "zlib", ".zz", zlib.decompress, ), ])
+def test_compressed_output(tmp_path, monkeypatch,
+                           format, suffix, decompress):
+    text = "Größe " * 1000
+
+    sizes = {}
+    for level in ( 0, 9, ):
+        path = tmp_path / f"out{level}.html"
+        tool = make_tool(monkeypatch, "-z", format,
+                         "--compress-level", str(level), "in.txt")
+        with tool.open_output(path) as output:
+            output.write(text)
+
+        path = path.with_name(path.name + suffix)
+        assert decompress(path.read_bytes()).decode("utf-8") == text
+        sizes[level] = path.stat().st_size
+
+    assert sizes[9] < len(text) < sizes[0]
+
+    # The suffix isn’t appended twice.
+    path = tmp_path / f"out.html{suffix}"
+    with tool.open_output(path) as output:
+        output.write(text)
+    assert decompress(path.read_bytes()).decode("utf-8") == text
+
+class KeepingBytesIO(io.BytesIO):
+    def close(self):
+        self.value = self.getvalue()
+        super().close()
+
+def test_compressed_stdout(monkeypatch):
+    buffer = KeepingBytesIO()
+    tool = make_tool(monkeypatch, "-z", "gzip", "in.txt")
+    monkeypatch.setattr(sys, "stdout",
+                        io.TextIOWrapper(buffer, encoding="utf-8"))
+
+    with tool.open_output() as output:
+        output.write("Hello")
+
+    assert gzip.decompress(buffer.value) == b"Hello"
+
+def test_plain_stdout(monkeypatch):
+    tool = make_tool(monkeypatch, "in.txt")
+    assert tool.open_output() is sys.stdout
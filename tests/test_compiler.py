@@ -0,0 +1,23 @@
+import pytest
+
+from tinymarkup.compiler import NullCompiler
+from tinymarkup.exceptions import (UnknownMacro, UnsuitableMacro,
+                                   UnknownLanguage)
+
+from toymarkup import make_context, ToyParser
+
+def check(source):
+    NullCompiler(make_context()).compile(ToyParser(), source)
+
+def test_null_compiler_accepts_valid_markup():
+    check("Some [[link]] and <<now>>.\n\n<<<toc>>>\n\n{de:Wörter}")
+
+@pytest.mark.parametrize("source, exception_class, lineno", [
+    ( "hello <<nope>>", UnknownMacro, 1, ),
+    ( "hello\n<<<now>>>", UnsuitableMacro, 2, ),
+    ( "hello <<toc>>", UnsuitableMacro, 1, ),
+    ( "a\n\nb {fr:mot}", UnknownLanguage, 3, ), ])
+def test_null_compiler_raises(source, exception_class, lineno):
+    with pytest.raises(exception_class) as info:
+        check(source)
+    assert info.value.lineno == lineno
@@ -0,0 +1,27 @@
+import pickle, pathlib
+
+from tinymarkup.exceptions import MarkupError, ParseError, Location
+
+class MacroFailed(MarkupError):
+    def __init__(self, macro_name, location=None):
+        super().__init__(f"Macro {macro_name} failed.", location=location)
+        self.macro_name = macro_name
+
+def test_pickled_error_keeps_location():
+    error = ParseError("Illegal character.",
+                       location=Location(3, "€"),
+                       filepath=pathlib.Path("a b.txt"))
+    copy = pickle.loads(pickle.dumps(error))
+
+    assert type(copy) is ParseError
+    assert copy.lineno == 3
+    assert copy.looking_at == "€"
+    assert str(copy) == str(error)
+
+def test_pickled_subclass_with_own_init():
+    error = MacroFailed("toc", Location(2, "<<toc>>"))
+    copy = pickle.loads(pickle.dumps(error))
+
+    assert copy.macro_name == "toc"
+    assert copy.lineno == 2
+    assert str(copy) == str(error)
@@ -0,0 +1,60 @@
+import random
+
+from tinymarkup.incremental import IncrementalResult
+
+from toymarkup import make_context, compile_html, every_break
+
+compiled = []
+
+def toy_compile(context, source):
+    compiled.append(source)
+    return compile_html(context, source)
+
+pieces = [ "a", " ", "\n", "\n\n", "x y", "\n \n\n", "",
+           "long paragraph text here\n\n", ]
+
+def test_random_edits_match_fresh_compile():
+    context = make_context()
+
+    for seed in range(50):
+        rnd = random.Random(seed)
+        source = "".join(rnd.choice(pieces) for a in range(20))
+        result = IncrementalResult(toy_compile, context, source, every_break)
+
+        for a in range(20):
+            offset = rnd.randint(0, len(result.source))
+            deleted = rnd.randint(0, min(8, len(result.source) - offset))
+            inserted = "".join(rnd.choice(pieces)
+                               for a in range(rnd.randint(0, 3)))
+
+            result = result.edit(offset, deleted, inserted)
+            fresh = IncrementalResult(toy_compile, context, result.source,
+                                      every_break)
+
+            assert result.chunks == fresh.chunks, (seed, a)
+            assert result.output == fresh.output, (seed, a)
+
+def test_unaffected_paragraphs_are_not_compiled_again():
+    context = make_context()
+    paragraphs = [ f"paragraph {n}" for n in range(10) ]
+    result = IncrementalResult(toy_compile, context,
+                               "\n\n".join(paragraphs), every_break)
+
+    # Change a word within the fifth paragraph.
+    offset = result.source.index("4")
+    compiled.clear()
+    result = result.edit(offset, 1, "four")
+    assert compiled == [ "paragraph four" ]
+
+    # Join the fifth and sixth paragraph.
+    offset = result.source.index("\n\nparagraph 5")
+    compiled.clear()
+    result = result.edit(offset, 2, " ")
+    assert compiled == [ "paragraph four paragraph 5" ]
+
+    # Split them again.
+    compiled.clear()
+    result = result.edit(offset, 1, "\n\n")
+    assert compiled == [ "paragraph four", "paragraph 5" ]
+
+    assert result.output == compile_html(context, result.source)
@@ -0,0 +1,30 @@
+import sys, os, pickle, subprocess
+
+from tinymarkup.language import Language, Languages
+
+def test_equal_languages_hash_alike():
+    english = Language("en", "english")
+    assert english == Language("en", "english")
+    assert english != Language("en", "simple")
+    assert Language("en", "english") in { english }
+
+def test_pickled_language_from_other_interpreter():
+    # str hashes are randomized per interpreter, a pickled Language
+    # must not carry its hash along.
+    pickled = subprocess.run(
+        [ sys.executable, "-c",
+          "import sys, pickle\n"
+          "from tinymarkup.language import Language\n"
+          "sys.stdout.buffer.write(pickle.dumps(Language('en', 'english')))" ],
+        capture_output=True, check=True,
+        env=dict(os.environ, PYTHONHASHSEED="1234"),
+        cwd=os.path.dirname(os.path.dirname(__file__))).stdout
+
+    english = pickle.loads(pickled)
+    assert english == Language("en", "english")
+    assert english in { Language("en", "english") }
+
+def test_languages_from_config_string():
+    languages = Languages.from_config_string("en:english; de:german")
+    assert languages.by_iso("de") == Language("de", "german")
+    assert Language("en", "english") in languages
@@ -0,0 +1,139 @@
+import io, sqlite3, threading
+
+import pytest
+from ll.xist.ns import html
+
+from tinymarkup.context import Context
+from tinymarkup.exceptions import UnknownMacro
+from tinymarkup.writer import content_digest
+
+from toymarkup import (make_context, compile_html, ToyParser,
+                       ToyHTMLCompiler)
+
+targets = [ "a b&c\"d'e<>", "ü/ä", "http://x/?a=1&b=2#f g",
+            "Page#Sec tion", "C++ (lang)", "%41 already", "plain", ]
+
+@pytest.mark.parametrize("target", targets)
+def test_html_link_matches_xist(target):
+    context = make_context()
+    text = "t<&>\"'ü"
+    assert context.html_link(target, text) \
+        == context.html_link_element(target, text).string()
+
+class SQLiteContext(Context):
+    """
+    Looks up link targets in a table, the way a wiki would in its
+    database, and counts the queries.
+    """
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.db = sqlite3.connect(":memory:", check_same_thread=False)
+        self.db.execute("CREATE TABLE page (title TEXT PRIMARY KEY)")
+        self.db.executemany("INSERT INTO page VALUES (?)",
+                            [ ("Home",), ("About",), ])
+        self.lookups = 0
+
+    def lookup_link_targets(self, targets):
+        self.lookups += 1
+        targets = list(targets)
+        placeholders = ", ".join("?" * len(targets))
+        existing = { title for title, in self.db.execute(
+            f"SELECT title FROM page WHERE title IN ({placeholders})",
+            targets) }
+        return { target: target in existing for target in targets }
+
+class ElementContext(SQLiteContext):
+    def html_link_element(self, target, text):
+        return html.a(text, href="/wiki/" + target, class_="wiki")
+
+source = "\n\n".join(f"[[Home]] [[About]] [[Missing {n % 3}]]"
+                     for n in range(30))
+
+def compile_batched(context):
+    output = io.StringIO()
+    with context.link_batch():
+        ToyHTMLCompiler(context, output).compile(ToyParser(), source)
+        return context.end_link_batch(output.getvalue())
+
+def test_one_lookup_per_batch():
+    context = make_context(SQLiteContext)
+    result = compile_batched(context)
+
+    assert context.lookups == 1
+    assert result.count('class="t4wiki-link"') == 60
+    assert result.count('class="t4wiki-link t4wiki-missing"') == 30
+    assert '<a href="Missing%200" class="t4wiki-link t4wiki-missing">' \
+        in result
+
+    # Nothing is cached between batches, a page created meanwhile
+    # is found by the next one.
+    context.db.execute("INSERT INTO page VALUES ('Missing 0')")
+    result = compile_batched(context)
+    assert context.lookups == 2
+    assert result.count('class="t4wiki-link t4wiki-missing"') == 20
+
+def test_missing_class_with_own_element():
+    context = make_context(ElementContext)
+    result = compile_batched(context)
+
+    assert '<a href="/wiki/Home" class="wiki">Home</a>' in result
+    assert '<a href="/wiki/Missing%201" class="wiki t4wiki-missing">' \
+        in result
+
+def test_failed_compilation_ends_the_batch():
+    context = make_context(SQLiteContext)
+    with pytest.raises(UnknownMacro):
+        with context.link_batch():
+            compile_html(context, "[[Home]] <<unknown>>")
+
+    assert compile_html(context, "[[Home]]") \
+        == '<p><a href="Home" class="t4wiki-link">Home</a></p>\n'
+
+def test_end_without_batch():
+    context = make_context()
+    with pytest.raises(RuntimeError):
+        context.end_link_batch("")
+
+    # A batch is ended by the context it was begun on.
+    with make_context().link_batch():
+        with pytest.raises(RuntimeError):
+            context.end_link_batch("")
+
+def test_concurrent_batches():
+    # Two threads compile on the same Context, their batches
+    # interleaved.
+    context = make_context(SQLiteContext)
+    barrier = threading.Barrier(2)
+    results = {}
+
+    def compile(name, source):
+        output = io.StringIO()
+        with context.link_batch():
+            ToyHTMLCompiler(context, output).compile(ToyParser(), source)
+            barrier.wait()
+            results[name] = context.end_link_batch(output.getvalue())
+            barrier.wait()
+
+    threads = [ threading.Thread(target=compile, args=( "a", "[[Home]]", )),
+                threading.Thread(target=compile, args=( "b", "[[Gone]]", )) ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {
+        "a": '<p><a href="Home" class="t4wiki-link">Home</a></p>\n',
+        "b": '<p><a href="Gone" class="t4wiki-link t4wiki-missing">'
+             'Gone</a></p>\n', }
+
+def test_digest_of_batched_output():
+    context = make_context(SQLiteContext)
+    output = io.StringIO()
+    with context.link_batch():
+        compiler = ToyHTMLCompiler(context, output, content_hash="sha256")
+        compiler.compile(ToyParser(), source)
+        assert compiler.writer.digest is None
+
+        result = context.end_link_batch(output.getvalue())
+
+    assert compiler.writer.digest == content_digest(result)
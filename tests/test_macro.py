@@ -0,0 +1,81 @@
+import copy, pickle
+
+import pytest
+
+from tinymarkup.macro import Macro, MacroLibrary
+from tinymarkup.exceptions import UnknownMacro, UnsuitableMacro
+
+from toymarkup import make_context
+
+class toc(Macro):
+    environments = { "block" }
+    checks = 0
+
+    @classmethod
+    def check_environment(toc, environment):
+        toc.checks += 1
+        super().check_environment(environment)
+
+class other_toc(Macro):
+    name = "toc"
+    environments = { "inline" }
+
+class clock(Macro):
+    stateless = True
+
+def test_instantiate_checks_only_once():
+    context = make_context()
+    library = MacroLibrary(toc)
+
+    toc.checks = 0
+    for a in range(3):
+        macro = library.instantiate("toc", context, "block")
+        assert macro.name == "toc"
+        assert macro.environment == "block"
+    assert toc.checks == 0
+
+    with pytest.raises(UnsuitableMacro):
+        library.instantiate("toc", context, "inline")
+
+    # Direct instantiation still checks.
+    with pytest.raises(UnsuitableMacro):
+        toc(context, "inline")
+
+def test_changes_to_the_library_are_seen():
+    context = make_context()
+    library = MacroLibrary(toc, clock)
+    library.instantiate("clock", context, "inline")
+
+    library["toc"] = other_toc
+    assert library.lookup("toc", "inline") is other_toc
+    with pytest.raises(UnsuitableMacro):
+        library.lookup("toc", "block")
+
+    dict.update(library, toc=toc)
+    assert library.lookup("toc", "block") is toc
+
+    del library["clock"]
+    with pytest.raises(UnknownMacro):
+        library.instantiate("clock", context, "inline")
+
+    library.pop("toc")
+    with pytest.raises(UnknownMacro):
+        library.lookup("toc", "block")
+
+def test_copies_have_their_own_tables():
+    context = make_context()
+    library = MacroLibrary(toc, clock)
+    macro = library.instantiate("clock", context, "inline")
+
+    duplicate = copy.copy(library)
+    assert type(duplicate) is MacroLibrary
+    duplicate["toc"] = other_toc
+    assert duplicate.lookup("toc", "inline") is other_toc
+    assert library.lookup("toc", "block") is toc
+    assert duplicate._instances == {}
+
+    assert library.instantiate("clock", context, "inline") is macro
+
+def test_pickled_library():
+    library = pickle.loads(pickle.dumps(MacroLibrary(toc)))
+    assert library.lookup("toc", "block") is toc
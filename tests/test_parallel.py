@@ -0,0 +1,42 @@
+import concurrent.futures
+
+import pytest
+
+from tinymarkup.parallel import compile_parallel
+from tinymarkup.budget import Budget
+from tinymarkup.exceptions import UnknownMacro, BudgetExceeded
+
+from toymarkup import make_context, compile_html, every_break
+
+source = "\n\n".join(f"Paragraph {n} with <<now>> and [[link {n}]]."
+                     for n in range(20))
+
+def test_process_pool():
+    context = make_context()
+    assert compile_parallel(compile_html, context, source, every_break,
+                            min_chunk_size=100, max_workers=2) \
+        == compile_html(context, source)
+
+def test_error_line_numbers():
+    context = make_context()
+    bad = source + "\n\nLast paragraph\nwith <<nope>>."
+
+    with concurrent.futures.ProcessPoolExecutor(2) as executor:
+        with pytest.raises(UnknownMacro) as info:
+            compile_parallel(compile_html, context, bad, every_break,
+                             min_chunk_size=100, executor=executor)
+
+    assert info.value.lineno == 42
+    assert info.value.looking_at == "<<nope>>."
+
+    with pytest.raises(UnknownMacro) as serial:
+        compile_html(context, bad)
+    assert serial.value.lineno == 42
+
+def test_budget_across_processes():
+    context = make_context()
+    context.budget = Budget(max_macro_calls=19)
+
+    with pytest.raises(BudgetExceeded):
+        compile_parallel(compile_html, context, source, every_break,
+                         min_chunk_size=100, max_workers=2)
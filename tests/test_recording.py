@@ -0,0 +1,21 @@
+import io
+
+from tinymarkup.compiler import RecordingCompiler, EventStream
+
+from toymarkup import (make_context, compile_html, ToyParser,
+                       ToyHTMLCompiler)
+
+source = "Some words, a [[link]] and <<now>>.\n\nA second paragraph."
+
+def test_replay_after_dumps_and_loads():
+    context = make_context()
+    events = RecordingCompiler(context).record(ToyParser(), source)
+    assert list(events)[-1] == ( "end_document", (), {}, )
+
+    output = io.StringIO()
+    compiler = ToyHTMLCompiler(context, output, content_hash="sha256")
+    EventStream.loads(events.dumps()).replay(compiler)
+
+    # The writer’s digest is set by end_document().
+    assert output.getvalue() == compile_html(context, source)
+    assert compiler.writer.digest is not None
@@ -0,0 +1,95 @@
+import sys, os, json, time, socket, subprocess
+
+import pytest
+
+from tinymarkup.server import CompileServer
+
+from toymarkup import make_tool, ToyTool
+
+class RecordingTool(ToyTool):
+    def to_html(self, outfile, source):
+        self.languages_used.append(self.context.root_language.iso)
+        super().to_html(outfile, source)
+
+@pytest.fixture
+def tool(monkeypatch):
+    tool = make_tool(monkeypatch, "--serve", tool_class=RecordingTool)
+    tool.context = tool.make_context()
+    tool.process_languages()
+    tool.languages_used = []
+    return tool
+
+def request(tool, **request):
+    server = CompileServer(tool.compile_request)
+    return json.loads(server.handle_line(json.dumps(request)))
+
+def test_success(tool):
+    assert request(tool, id=1, source="Hello <<now>>") \
+        == { "id": 1, "output": "<p>Hello NOW</p>\n" }
+
+def test_markup_error(tool):
+    assert request(tool, id=2, source="Hello\n<<nope>>") == {
+        "id": 2,
+        "error": { "type": "UnknownMacro",
+                   "message": "Macro named “nope” not found.",
+                   "lineno": 2,
+                   "looking_at": "<<nope>>", } }
+
+@pytest.mark.parametrize("line", [ "{", "[1, 2]", '"source"', ])
+def test_bad_request(tool, line):
+    response = json.loads(CompileServer(tool.compile_request)
+                          .handle_line(line))
+    assert response["id"] is None
+    assert response["error"]["type"] == "BadRequest"
+
+def test_unknown_format(tool):
+    response = request(tool, id=3, source="Hello", format="pdf")
+    assert response["error"]["type"] == "ValueError"
+    assert "pdf" in response["error"]["message"]
+
+def test_unknown_language(tool):
+    response = request(tool, id=4, source="Hello", language="fr")
+    assert response["error"]["type"] == "UnknownLanguage"
+    assert tool.context.root_language.iso == "en"
+
+def test_root_language_is_restored(tool):
+    assert "output" in request(tool, source="Hallo", language="de")
+    assert tool.context.root_language.iso == "en"
+
+    assert "error" in request(tool, source="<<nope>>", language="de")
+    assert tool.context.root_language.iso == "en"
+
+    request(tool, source="Hello")
+    assert tool.languages_used == [ "de", "de", "en", ]
+
+def test_unix_socket(tmp_path):
+    path = tmp_path / "compile.sock"
+    tests = os.path.dirname(__file__)
+    process = subprocess.Popen(
+        [ sys.executable, "-c",
+          "from toymarkup import ToyTool; ToyTool()()",
+          "-l", "en:english", "--serve", "--socket", str(path), ],
+        cwd=tests,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join([
+            tests, os.path.dirname(tests), ])))
+
+    try:
+        for a in range(100):
+            if path.exists():
+                break
+            time.sleep(0.05)
+
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(str(path))
+            client.sendall(b'{"id": 1, "source": "Gr\xc3\xbc\xc3\x9fe"}\n'
+                           b'{"id": 2, "source": "<<nope>>"}\n')
+            reader = client.makefile("rb")
+            first = json.loads(reader.readline())
+            second = json.loads(reader.readline())
+    finally:
+        process.terminate()
+        process.wait()
+
+    assert first == { "id": 1, "output": "<p>Grüße</p>\n" }
+    assert second["id"] == 2
+    assert second["error"]["type"] == "UnknownMacro"
@@ -0,0 +1,73 @@
+import asyncio, threading, time
+
+import pytest
+
+from tinymarkup.exceptions import UnknownMacro
+from tinymarkup.stream import iter_output, aiter_output
+
+from toymarkup import make_context, compile_html, ToyHTMLCompiler, ToyParser
+
+source = "\n\n".join([ f"Paragraph {i} with <<now>> and some words."
+                       for i in range(2000) ])
+
+def writer(source, started=None):
+    context = make_context()
+
+    def write_to(output):
+        if started is not None:
+            started.append(threading.current_thread())
+        ToyHTMLCompiler(context, output).compile(ToyParser(), source)
+
+    return write_to
+
+def test_iter_output():
+    chunks = list(iter_output(writer(source), 4096))
+    assert len(chunks) > 1
+    assert "".join(chunks) == compile_html(make_context(), source)
+
+def test_iter_output_raises():
+    with pytest.raises(UnknownMacro):
+        list(iter_output(writer(source + "\n\n<<unknown>>")))
+
+def test_iter_output_closed_early():
+    started = []
+    chunks = iter_output(writer(source, started), 100, 2)
+    next(chunks)
+    chunks.close()
+
+    started[0].join(timeout=2)
+    assert not started[0].is_alive()
+
+def test_aiter_output():
+    async def collect():
+        return [ chunk async for chunk in aiter_output(writer(source), 4096) ]
+
+    assert "".join(asyncio.run(collect())) == compile_html(make_context(),
+                                                          source)
+
+def test_aiter_output_cancelled():
+    started = []
+
+    def slow_write_to(output):
+        started.append(threading.current_thread())
+        output.write("first")
+        output.flush()
+        for a in range(100):
+            time.sleep(0.02)
+            output.write("more")
+
+    async def consume():
+        async for chunk in aiter_output(slow_write_to, 1):
+            pass
+
+    async def main():
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+
+    started[0].join(timeout=2)
+    assert not started[0].is_alive()
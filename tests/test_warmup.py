@@ -0,0 +1,15 @@
+import pytest
+
+from tinymarkup.warmup import warm_up
+
+from tinymarkup.context import Context
+from tinymarkup.macro import MacroLibrary
+
+def test_macro_modules_need_a_context():
+    with pytest.raises(ValueError):
+        warm_up(macro_modules=("toymarkup",), freeze=False)
+
+def test_macro_modules_extend_the_context():
+    context = Context(MacroLibrary())
+    warm_up(context, macro_modules=("toymarkup",), freeze=False)
+    assert "now" in context.macro_library
@@ -0,0 +1,165 @@
+import io, hashlib
+
+import pytest
+
+from tinymarkup.language import Language
+from tinymarkup.writer import HTMLWriter, content_digest
+
+english = Language("en", "english")
+
+def test_hashing_writer_passes_file_methods_on():
+    output = io.StringIO()
+    writer = HTMLWriter(output, english, content_hash="sha256")
+    writer.print("x", "\x00", flush=True)
+    writer.output.flush()
+
+    assert writer.end_document() == content_digest(output.getvalue())
+    assert writer.digest == hashlib.sha256(b"x \x00\n").hexdigest()
+
+    writer.output.close()
+    assert output.closed
+
+class RecordingOutput(object):
+    """
+    Output that keeps every write() separately.
+    """
+    def __init__(self):
+        self.writes = []
+
+    def write(self, s):
+        self.writes.append(s)
+        return len(s)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return "".join(self.writes)
+
+def test_text_is_coalesced_and_escaped():
+    output = RecordingOutput()
+    writer = HTMLWriter(output, english)
+    writer.open("p")
+    for s in ( "a", " <b>", " & ", "\"c\" 'd'", ):
+        writer.text(s)
+    writer.close("p")
+
+    assert output.writes == [ "<p>", "a &lt;b&gt; &amp; \"c\" 'd'", "</p>\n" ]
+
+@pytest.mark.parametrize("flush, expected", [
+    ( lambda writer: writer.open("em"), "x<em>", ),
+    ( lambda writer: writer.close("p"), "x</p>\n", ),
+    ( lambda writer: writer.print("<br>", end=""), "x<br>", ),
+    ( lambda writer: writer.end_document(), "x", ), ])
+def test_text_is_flushed(flush, expected):
+    output = RecordingOutput()
+    writer = HTMLWriter(output, english)
+    writer.open("p")
+    writer.text("x")
+    assert output.writes == [ "<p>" ]
+
+    flush(writer)
+    assert output.getvalue() == "<p>" + expected
+
+def write_document(layout):
+    output = io.StringIO()
+    writer = HTMLWriter(output, english, layout=layout)
+
+    writer.open("div", class_="doc")
+    writer.open("ul")
+    for item in ( "one", "two & <three>", ):
+        writer.open("li")
+        writer.text(item)
+        writer.close("li")
+    writer.close("ul")
+
+    writer.open("p")
+    writer.text("A ")
+    writer.open("em")
+    writer.text("b")
+    writer.close("em")
+    writer.print("<br>", "c", sep="|")
+    writer.close("p")
+
+    writer.open("table")
+    writer.open("tr")
+    for cell in "12":
+        writer.open("td")
+        writer.text(cell)
+        writer.close("td")
+    writer.close("tr")
+    writer.close("table")
+
+    writer.open("pre")
+    writer.text("  x\n    y\n")
+    writer.close("pre")
+
+    writer.open("code")
+    writer.open("p")
+    writer.text("  z")
+    writer.close("p")
+    writer.close("code")
+
+    writer.close("div")
+    writer.end_document()
+
+    return output.getvalue()
+
+def test_default_layout():
+    # What HTMLWriter wrote before there were layouts.
+    assert write_document("default") == (
+        '<div class="doc">\n'
+        '<ul>\n'
+        '<li>one</li>\n'
+        '<li>two &amp; &lt;three&gt;</li>\n'
+        '</ul>\n'
+        '<p>A <em>b</em><br>|c\n'
+        '</p>\n'
+        '<table>\n'
+        '<tr>\n'
+        '<td>1</td>\n'
+        '<td>2</td>\n'
+        '</tr>\n'
+        '</table>\n'
+        '<pre>  x\n'
+        '    y\n'
+        '</pre><code>\n'
+        '<p>  z</p>\n'
+        '</code>\n'
+        '</div>\n' )
+
+def test_compact_layout():
+    assert write_document("compact") == (
+        '<div class="doc"><ul><li>one<li>two &amp; &lt;three&gt;</ul>'
+        '<p>A <em>b</em><br>|c\n</p>'
+        '<table><tr><td>1<td>2</table>'
+        '<pre>  x\n    y\n</pre>'
+        '<code>\n<p>  z</p>\n</code>'
+        '</div>' )
+
+def test_pretty_layout():
+    assert write_document("pretty") == (
+        '<div class="doc">\n'
+        '  <ul>\n'
+        '    <li>one</li>\n'
+        '    <li>two &amp; &lt;three&gt;</li>\n'
+        '  </ul>\n'
+        '  <p>A <em>b</em><br>|c\n'
+        '  </p>\n'
+        '  <table>\n'
+        '    <tr>\n'
+        '      <td>1</td>\n'
+        '      <td>2</td>\n'
+        '    </tr>\n'
+        '  </table>\n'
+        '<pre>  x\n'
+        '    y\n'
+        '</pre>\n'
+        '  <code>\n'
+        '<p>  z</p>\n'
+        '</code>\n'
+        '</div>\n' )
+
+def test_unknown_layout():
+    with pytest.raises(ValueError):
+        HTMLWriter(io.StringIO(), english, layout="fancy")
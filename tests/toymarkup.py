@@ -0,0 +1,177 @@
+"""
+A minimal markup language to drive tinymarkup’s machinery in the tests:
+words, other characters, blank lines separating paragraphs, <<macro>>
+and <<<block_macro>>> calls, [[link]]s and {de:text in a language}.
+"""
+import io, sys
+
+import ply.lex
+
+from tinymarkup.parser import Parser
+from tinymarkup.compiler import Compiler
+from tinymarkup.writer import HTMLWriter
+from tinymarkup.macro import Macro, MacroLibrary
+from tinymarkup.context import Context
+from tinymarkup.cmdline import CmdlineTool
+from tinymarkup.language import Language, Languages
+from tinymarkup.exceptions import ParseError, UnknownLanguage
+
+tokens = ( "WORD", "OTHER", "PARBREAK", "BLOCKMACRO", "MACRO", "LINK",
+           "LANGSTART", "LANGEND", )
+
+t_WORD = r"\w+"
+
+def t_PARBREAK(t):
+    r"\n[ \t]*(\n[ \t]*)+"
+    return t
+
+def t_BLOCKMACRO(t):
+    r"<<<\w+>>>"
+    t.value = t.value[3:-3]
+    return t
+
+def t_MACRO(t):
+    r"<<\w+>>"
+    t.value = t.value[2:-2]
+    return t
+
+def t_LINK(t):
+    r"\[\[[^]]*\]\]"
+    t.value = t.value[2:-2]
+    return t
+
+def t_LANGSTART(t):
+    r"\{[a-z]{2}:"
+    t.value = t.value[1:-1]
+    return t
+
+def t_LANGEND(t):
+    r"\}"
+    return t
+
+t_OTHER = r"[^\w\n<\[{}]+|\n|<|\[|\{"
+
+def t_error(t):
+    raise ParseError("Illegal character.")
+
+baselexer = ply.lex.lex()
+
+class ToyParser(Parser):
+    def __init__(self):
+        super().__init__(baselexer)
+
+    def parse(self, source, compiler):
+        compiler.begin_document(self)
+        compiler.begin_paragraph()
+        for token in self.lexer.tokenize(source):
+            if token.type == "WORD":
+                compiler.word(token.value)
+            elif token.type == "OTHER":
+                compiler.other_characters(token.value)
+            elif token.type == "PARBREAK":
+                compiler.end_paragraph()
+                compiler.begin_paragraph()
+            elif token.type == "BLOCKMACRO":
+                compiler.macro(token.value, "block")
+            elif token.type == "MACRO":
+                compiler.macro(token.value, "inline")
+            elif token.type == "LANGSTART":
+                compiler.begin_language(token.value)
+            elif token.type == "LANGEND":
+                compiler.end_language()
+            elif token.type == "LINK":
+                compiler.link(token.value, token.value)
+        compiler.end_paragraph()
+        compiler.end_document()
+
+class ToyHTMLCompiler(Compiler):
+    def __init__(self, context, output, **kw):
+        super().__init__(context)
+        self.writer = HTMLWriter(output, context.root_language, **kw)
+
+    def word(self, s):
+        self.writer.text(s)
+
+    def other_characters(self, s):
+        self.writer.text(s)
+
+    def begin_paragraph(self):
+        self.writer.open("p")
+
+    def end_paragraph(self):
+        self.writer.close("p")
+
+    def link(self, target, text):
+        self.writer.print(self.context.html_link(target, text), end="")
+
+    def macro(self, name, environment):
+        macro = self.context.macro_library.instantiate(
+            name, self.context, environment, self.parser.location)
+        self.writer.print(macro.html(), end=macro.end)
+
+    def begin_language(self, iso):
+        try:
+            self.context.language_by_iso(iso)
+        except UnknownLanguage as exc:
+            exc.location = self.parser.location
+            raise
+        self.writer.open("span", lang=iso)
+
+    def end_language(self):
+        self.writer.close("span")
+
+    def end_document(self):
+        self.writer.end_document()
+        super().end_document()
+
+class now(Macro):
+    environments = { "inline" }
+
+    def html(self):
+        return "NOW"
+
+class toc(Macro):
+    environments = { "block" }
+
+    def html(self):
+        return "<nav>TOC</nav>"
+
+# For warm_up() and the command line’s -m.
+macro_library = MacroLibrary(now, toc)
+
+def make_context(context_class=Context):
+    context = context_class(MacroLibrary(now, toc), Languages())
+    context.register_language(Language("en", "english"))
+    context.register_language(Language("de", "german"))
+    return context
+
+def compile_html(context, source, **kw):
+    output = io.StringIO()
+    ToyHTMLCompiler(context, output, **kw).compile(ToyParser(), source)
+    return output.getvalue()
+
+def every_break(source, match):
+    """
+    All blank lines end a top-level paragraph in this markup.
+    """
+    return True
+
+class ToyTool(CmdlineTool):
+    def make_context(self):
+        return self._context_class(MacroLibrary(now, toc), Languages())
+
+    def make_parser(self):
+        return ToyParser()
+
+    def to_html(self, outfile, source):
+        compiler = ToyHTMLCompiler(self.context, outfile,
+                                   layout=self.args.layout)
+        compiler.compile(ToyParser(), source)
+
+def make_tool(monkeypatch, *argv, tool_class=ToyTool):
+    """
+    Return a ToyTool for the command line arguments `argv`.
+    """
+    monkeypatch.setattr(sys, "argv", [ "toy", "-l", "en:english",
+                                       "-l", "de:german", *argv ])
+    return tool_class()
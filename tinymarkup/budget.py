@@ -0,0 +1,184 @@
+# Copyright (C) 2023 Diedrich Vorberg
+#
+# Contact: diedrich@tux4web.de
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+import time, contextvars, contextlib
+
+from .exceptions import BudgetExceeded
+
+class Budget(object):
+    """
+    Limits on the resources a single document’s compilation may use.
+    Limits that are None are not enforced. A Budget only holds the
+    limits and may be shared; assign one to Context.budget. Each
+    compilation keeps its own count in a BudgetTracker, see start().
+    """
+    def __init__(self, max_tokens:int=None, max_output:int=None,
+                 max_macro_calls:int=None, timeout:float=None):
+        """
+        `max_output` is counted in characters written, `timeout`
+        in seconds from the start of the document.
+        """
+        self.max_tokens = max_tokens
+        self.max_output = max_output
+        self.max_macro_calls = max_macro_calls
+        self.timeout = timeout
+
+    def start(self):
+        return BudgetTracker(self)
+
+class BudgetTracker(object):
+    """
+    What one document’s compilation has spent of a Budget. While a
+    tracker is active (see activate()), the lexer, the Writers’ output
+    and Macro instantiation count against it. Compiler.begin_document()
+    activates a new one unless one is active already, which is how
+    the chunks of a document compiled one by one share one budget.
+    """
+    def __init__(self, budget:Budget):
+        self.budget = budget
+        self.tokens = 0
+        self.output = 0
+        self.macro_calls = 0
+
+        # time.monotonic() is system-wide, the deadline stays valid
+        # when the tracker is pickled into a worker process.
+        if budget.timeout is None:
+            self.deadline = None
+        else:
+            self.deadline = time.monotonic() + budget.timeout
+
+        # The LexerWrapper currently tokenizing, so errors raised on
+        # output may report a location.
+        self.lexer = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["lexer"] = None
+        return state
+
+    @property
+    def location(self):
+        if self.lexer is None:
+            return None
+        else:
+            return self.lexer.location
+
+    def exceeded(self, what, limit):
+        raise BudgetExceeded(f"Compilation exceeded its budget of "
+                             f"{limit} {what}.", location=self.location)
+
+    def check_deadline(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.exceeded("seconds", self.budget.timeout)
+
+    def count_token(self):
+        self.tokens += 1
+        max_tokens = self.budget.max_tokens
+        if max_tokens is not None and self.tokens > max_tokens:
+            self.exceeded("tokens", max_tokens)
+
+        self.check_deadline()
+
+    def count_output(self, length:int):
+        self.output += length
+        max_output = self.budget.max_output
+        if max_output is not None and self.output > max_output:
+            self.exceeded("characters of output", max_output)
+
+        self.check_deadline()
+
+    def count_macro_call(self):
+        self.macro_calls += 1
+        max_macro_calls = self.budget.max_macro_calls
+        if max_macro_calls is not None and self.macro_calls > max_macro_calls:
+            self.exceeded("macro calls", max_macro_calls)
+
+        self.check_deadline()
+
+    @property
+    def spent(self):
+        return ( self.tokens, self.output, self.macro_calls, )
+
+    def charge(self, spent):
+        """
+        Add what was `spent` elsewhere, e.g. by a copy of this tracker
+        in a worker process, and check the limits.
+        """
+        tokens, output, macro_calls = spent
+
+        self.tokens += tokens
+        self.output += output
+        self.macro_calls += macro_calls
+
+        for what, count, limit in (
+                ( "tokens", self.tokens, self.budget.max_tokens, ),
+                ( "characters of output", self.output,
+                  self.budget.max_output, ),
+                ( "macro calls", self.macro_calls,
+                  self.budget.max_macro_calls, ), ):
+            if limit is not None and count > limit:
+                self.exceeded(what, limit)
+
+        self.check_deadline()
+
+_current_tracker = contextvars.ContextVar("tinymarkup_budget_tracker",
+                                          default=None)
+
+def current_tracker() -> BudgetTracker:
+    """
+    The BudgetTracker active in this thread or task or None.
+    """
+    return _current_tracker.get()
+
+def activate(tracker:BudgetTracker):
+    """
+    Make `tracker` the current one. Returns a token for deactivate().
+    """
+    return _current_tracker.set(tracker)
+
+def deactivate(token):
+    _current_tracker.reset(token)
+
+@contextlib.contextmanager
+def tracking(tracker:BudgetTracker):
+    """
+    Context manager activating `tracker` for the with-block.
+    """
+    token = activate(tracker)
+    try:
+        yield tracker
+    finally:
+        deactivate(token)
+
+def count_macro_call():
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.count_macro_call()
+
+class BudgetedOutput(object):
+    """
+    Wrap a Writer’s output file object to count what is written to it
+    against the current BudgetTracker, if any.
+    """
+    def __init__(self, output):
+        self._output = output
+
+    def write(self, s:str):
+        tracker = _current_tracker.get()
+        if tracker is not None:
+            tracker.count_output(len(s))
+        return self._output.write(s)
+
+    def __getattr__(self, name):
+        return getattr(self._output, name)
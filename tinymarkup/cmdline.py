@@ -1,9 +1,60 @@
 import sys, os, os.path as op, time, argparse, pathlib, subprocess
-import traceback, re, importlib
+import traceback, re, importlib, io, zlib
 
 from .exceptions import MarkupError
 from .context import Context
+from .compiler import NullCompiler
 from .language import Language
+from .server import CompileServer
+
+class CompressedOutput(io.RawIOBase):
+    """
+    Binary file object that compresses what is written to it
+    on the fly and passes it on to `raw`.
+    """
+    def __init__(self, raw, compressor):
+        super().__init__()
+        self._raw = raw
+        self._compressor = compressor
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._raw.write(self._compressor.compress(b))
+        return len(b)
+
+    def close(self):
+        if not self.closed:
+            self._raw.write(self._compressor.flush())
+            self._raw.close()
+        super().close()
+
+class LazyOutput(object):
+    """
+    Stand-in for the output file that opens it on first use, so runs
+    that don’t write to it, like --check and --serve, don’t create or
+    truncate it.
+    """
+    def __init__(self, open_output):
+        self._open_output = open_output
+        self._file = None
+
+    @property
+    def file(self):
+        if self._file is None:
+            self._file = self._open_output()
+        return self._file
+
+    def write(self, s):
+        return self.file.write(s)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
 
 class CmdlineTool(object):
     """
@@ -11,6 +62,15 @@ class CmdlineTool(object):
     """
     default_editor = "emacs"
 
+    # Maps the formats available for --compress to their file name
+    # suffix and zlib’s “wbits” parameter that selects the container.
+    compression_formats = { "gzip": ( ".gz", 16 + zlib.MAX_WBITS, ),
+                            "zlib": ( ".zz", zlib.MAX_WBITS, ), }
+
+    # Maps the output formats available in --serve mode to the names
+    # of methods called as method(outfile, source).
+    output_formats = { "html": "to_html", }
+
     def __init__(self, extra_context=None):
         """
         Starting with a copy of the standard macro library loaded
@@ -27,6 +87,8 @@ class CmdlineTool(object):
         self.error = parser.error
 
         self.args = parser.parse_args()
+        self.args.outfile = LazyOutput(
+            lambda: self.open_output(self.args.outfilepath))
 
     def make_argument_parser(self):
         """
@@ -35,9 +97,23 @@ class CmdlineTool(object):
         parser = argparse.ArgumentParser()
         add = parser.add_argument
 
-        add("--outfile", "-o",
-            nargs='?', type=argparse.FileType('w'),
-            default=sys.stdout)
+        add("--outfile", "-o", dest="outfilepath",
+            nargs='?', type=pathlib.Path, default=None,
+            help="Write to this file instead of stdout. It is only "
+            "opened once there is output for it.")
+        add("--compress", "-z", choices=self.compression_formats.keys(),
+            default=None,
+            help="Compress the output while writing it. The appropriate "
+            "suffix is appended to the output file’s name.")
+        add("--compress-level", type=int, default=6,
+            dest="compress_level", choices=range(10),
+            help="Compression level from 0 (none) to 9 (best), "
+            "defaults to 6.")
+        add("--layout", choices=[ "default", "compact", "pretty", ],
+            default="default",
+            help="Output layout for HTMLWriter: “compact” leaves out "
+            "all optional whitespace and end tags, “pretty” indents "
+            "nested block level elements for debugging.")
         add("--timing", "-t", action="store_true", default=False,
             help="Print timing information on each file to stderr.")
 
@@ -62,7 +138,17 @@ class CmdlineTool(object):
         add("--wait", "-w", action="store_true",
             default=False,
             help="Wait before invoking the editor.")
-        add("infilepaths", nargs="+", type=pathlib.Path)
+        add("--check", action="store_true", default=False,
+            help="Only validate the input files, don’t produce output. "
+            "All files are checked and those with errors are reported "
+            "on stderr.")
+        add("--serve", action="store_true", default=False,
+            help="Run as a server that keeps its context loaded and "
+            "answers JSON-lines compile requests on stdin/stdout.")
+        add("--socket", default=None, type=pathlib.Path,
+            help="With --serve, listen on this Unix domain socket instead "
+            "of stdin/stdout.")
+        add("infilepaths", nargs="*", type=pathlib.Path)
 
         return parser
 
@@ -111,7 +197,41 @@ class CmdlineTool(object):
             self.error("You must specify at least one language "
                        "so the document have a root language.")
 
+    def open_output(self, path:pathlib.Path=None):
+        """
+        Open `path` or stdout if None for writing text, compressed
+        according to --compress. Use this for any output files.
+        """
+        if self.args.compress is None:
+            if path is None:
+                return sys.stdout
+            else:
+                return path.open("w")
+
+        suffix, wbits = self.compression_formats[self.args.compress]
+
+        if path is None:
+            raw = sys.stdout.buffer
+        else:
+            if path.suffix != suffix:
+                path = path.with_name(path.name + suffix)
+            raw = path.open("wb")
+
+        compressor = zlib.compressobj(self.args.compress_level,
+                                      zlib.DEFLATED, wbits)
+        return io.TextIOWrapper(
+            io.BufferedWriter(CompressedOutput(raw, compressor)),
+            encoding="utf-8")
+
+    @property
+    def html_separator(self):
+        if self.args.layout == "compact":
+            return ""
+        else:
+            return "\n"
+
     def begin_html(self):
+        sep = self.html_separator
         print('<!DOCTYPE html>',
               '<html>',
               '<head>',
@@ -119,12 +239,13 @@ class CmdlineTool(object):
               '<meta charset="utf-8">',
               '</head>',
               '<body>',
-              sep="\n", file=self.args.outfile)
+              sep=sep, end=sep, file=self.args.outfile)
 
     def end_html(self):
+        sep = self.html_separator
         print('</body>',
               '</html>',
-              sep="\n", file=self.args.outfile)
+              sep=sep, end=sep, file=self.args.outfile)
 
     def invoke_editor(self, infilepath, lineno):
         editor = os.getenv("EDITOR", None)
@@ -154,6 +275,54 @@ class CmdlineTool(object):
     def to_html(self, outfile, source):
         raise NotImplementedError()
 
+    # The compiler check() runs the parser with.
+    null_compiler_class = NullCompiler
+
+    def make_parser(self):
+        """
+        Return a Parser object for this tool’s markup, used by check().
+        By default None.
+        """
+        return None
+
+    def check(self, source):
+        """
+        Parse `source` and raise a MarkupError if it contains one. The
+        parser from make_parser() is run with a null_compiler_class
+        object, which checks macros and languages but builds no output.
+        If make_parser() returns None, the source is converted
+        to_html() and the output discarded.
+        """
+        parser = self.make_parser()
+        if parser is None:
+            with open(os.devnull, "w") as devnull:
+                self.to_html(devnull, source)
+        else:
+            self.null_compiler_class(self.context).compile(parser, source)
+
+    def check_file(self, infilepath) -> bool:
+        """
+        Report a MarkupError in `infilepath` on stderr and return False
+        or return True if the file was ok.
+        """
+        with infilepath.open() as fp:
+            source = fp.read()
+
+        try:
+            check_start = time.time()
+            self.check(source)
+            check_end = time.time()
+        except MarkupError as exc:
+            exc.filepath = infilepath
+            print(f"{infilepath}: {exc}", file=sys.stderr)
+            return False
+        else:
+            if self.args.timing:
+                print("%s: %.4f sec" % ( infilepath.name,
+                                        check_end-check_start,),
+                      file=sys.stderr)
+            return True
+
     def process(self, infilepath) -> bool:
         with infilepath.open() as fp:
             source = fp.read()
@@ -186,7 +355,40 @@ class CmdlineTool(object):
                 else:
                     raise
 
+    def compile_request(self, source, format=None, language=None) -> str:
+        """
+        Compile `source` for a --serve request and return the output.
+        `format` is a key in self.output_formats, “html” by default.
+        `language` is the ISO code of the document’s root language.
+        """
+        method_name = self.output_formats.get(format or "html", None)
+        if method_name is None:
+            raise ValueError(f"Unknown output format: {repr(format)}")
+
+        root_language = self.context.root_language
+        if language is not None:
+            self.context.root_language = self.context.language_by_iso(
+                language)
+
+        try:
+            output = io.StringIO()
+            getattr(self, method_name)(output, source)
+            return output.getvalue()
+        finally:
+            self.context.root_language = root_language
+
+    def serve(self):
+        server = CompileServer(self.compile_request)
+
+        if self.args.socket is None:
+            server.serve_jsonlines(sys.stdin, sys.stdout)
+        else:
+            server.serve_unix_socket(str(self.args.socket))
+
     def __call__(self):
+        if not self.args.serve and not self.args.infilepaths:
+            self.error("Please specify at least one input file.")
+
         self.process_context()
         self.context = self.make_context()
 
@@ -194,6 +396,22 @@ class CmdlineTool(object):
 
         self.process_languages()
 
+        if self.args.serve:
+            self.serve()
+            return
+
+        if self.args.check:
+            failed = [ infilepath
+                       for infilepath in self.args.infilepaths
+                       if not self.check_file(infilepath) ]
+
+            if failed:
+                print(f"{len(failed)} of {len(self.args.infilepaths)} "
+                      "file(s) failed.", file=sys.stderr)
+                sys.exit(1)
+            else:
+                return
+
         self.begin_html()
 
         for infilepath in self.args.infilepaths:
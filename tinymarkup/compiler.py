@@ -12,12 +12,19 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
 # GNU General Public License for more details.
 
-import dataclasses
+import dataclasses, json
 
+from . import budget
 from .context import Context
+from .exceptions import MarkupError
+from .language import Language
 from .parser import Parser
 
 class Compiler(object):
+    # Token for budget.deactivate() if begin_document() activated
+    # a BudgetTracker for this document.
+    _budget_token = None
+
     def __init__(self, context:Context=None):
         if context is None:
             self.context = Context()
@@ -25,7 +32,10 @@ class Compiler(object):
             self.context = context
 
     def compile(self, parser, source):
-        parser.parse(source, self)
+        try:
+            parser.parse(source, self)
+        finally:
+            self._end_budget()
 
     def begin_document(self, parser:Parser):
         """
@@ -34,13 +44,82 @@ class Compiler(object):
         """
         self.parser = parser
 
+        # Start tracking the context’s budget for this document, unless
+        # the caller is tracking it for a larger document already.
+        self._end_budget()
+        if ( self.context.budget is not None
+             and budget.current_tracker() is None ):
+            self._budget_token = budget.activate(self.context.budget.start())
+
     def end_document(self):
         """
         Perform finishing tasks on internal datastructures
         before the compilation result may be retrieved.
         """
+        self._end_budget()
+
+    def _end_budget(self):
+        if self._budget_token is not None:
+            budget.deactivate(self._budget_token)
+            self._budget_token = None
+
+class NullCompiler(Compiler):
+    """
+    A compiler that produces no output at all. It is used to validate
+    markup, i.e. to have the parser run and raise MarkupErrors, without
+    building HTML or xsc nodes.
+
+    The parser’s calls to macro(name, environment, …) and
+    begin_language(iso, …) are checked with check_macro() and
+    check_language(). Any other compiler method the parser calls is
+    accepted and ignored. Subclasses for a markup whose compilers are
+    called differently for macros and languages overload these two.
+    """
+    def __init__(self, context:Context=None):
+        super().__init__(context)
+        self.parser = None
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        return self._ignore
+
+    def _ignore(self, *args, **kw):
         pass
 
+    def macro(self, name, environment, *args, **kw):
+        self.check_macro(name, environment)
+
+    def begin_language(self, iso, *args, **kw):
+        self.check_language(iso)
+
+    def check_macro(self, name, environment):
+        """
+        Look up the macro named `name` and check whether it may be used
+        in `environment`. Raises UnknownMacro or UnsuitableMacro. The
+        macro is neither instantiated nor called.
+        """
+        return self.context.macro_library.lookup(name, environment,
+                                                 self.location)
+
+    def check_language(self, iso):
+        """
+        Raise UnknownLanguage if `iso` is not registered with the context.
+        """
+        try:
+            return self.context.language_by_iso(iso)
+        except MarkupError as exc:
+            exc.location = self.location
+            raise
+
+    @property
+    def location(self):
+        if self.parser is None:
+            return None
+        else:
+            return self.parser.location
+
 class CompilerDuplexer(object):
     """
     A CompilerDuplexer object acts as a stand-in for more than one
@@ -56,22 +135,142 @@ class CompilerDuplexer(object):
         be None.
         """
         self._compilers = [ c for c in compilers if c is not None ]
+        self._proxies = {}
 
     def duplex(self, parser, source):
         parser.parse(source, self)
 
     def __getattr__(self, name):
-        return self.MethodProxy(self._compilers, name)
+        # MethodProxy objects are immutable, one per method name will do.
+        try:
+            return self._proxies[name]
+        except KeyError:
+            proxy = self.MethodProxy(tuple(self._compilers), name)
+            self._proxies[name] = proxy
+            return proxy
 
-    @dataclasses.dataclass
+    @dataclasses.dataclass(frozen=True, slots=True)
     class MethodProxy(object):
-        compilers: list
+        compilers: tuple
         method_name: str
 
         def __call__(self, *args, **kw):
             for compiler in self.compilers:
                 method = getattr(compiler, self.method_name)
-                method(*args, *kw)
+                method(*args, **kw)
 
         def __getattr__(self, name):
             return getattr(getattr(self.compilers[0], self.method_name), name)
+
+class RecordingCompiler(Compiler):
+    """
+    A compiler that records the method calls the parser makes on it
+    into an EventStream, which may be replayed into any other compiler
+    later. The parser’s calls must not depend on the compiler’s return
+    values, which are all None here.
+    """
+    def __init__(self, context:Context=None):
+        super().__init__(context)
+        self.events = EventStream()
+
+    def record(self, parser, source):
+        self.events = EventStream()
+        self.compile(parser, source)
+        return self.events
+
+    def begin_document(self, parser:Parser):
+        super().begin_document(parser)
+        self.events.append("begin_document", (), {})
+
+    def end_document(self):
+        super().end_document()
+        self.events.append("end_document", (), {})
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def record(*args, **kw):
+            self.events.append(name, args, kw)
+
+        return record
+
+class EventStream(object):
+    """
+    A list of compiler method calls as ( name, args, kw, ) tuples.
+    The method names are stored only once, each event refers to them
+    by index. dumps() returns a JSON representation as long as all
+    arguments are strings, numbers, lists, dicts or Language objects.
+    """
+    def __init__(self, names=(), events=()):
+        self.names = list(names)
+        self._indices = { name: idx for idx, name in enumerate(self.names) }
+        self.events = list(events)
+
+    def append(self, name, args, kw):
+        idx = self._indices.get(name, None)
+        if idx is None:
+            idx = len(self.names)
+            self.names.append(name)
+            self._indices[name] = idx
+
+        if kw:
+            self.events.append( (idx, args, kw,) )
+        else:
+            self.events.append( (idx, args,) )
+
+    def __iter__(self):
+        for event in self.events:
+            if len(event) == 2:
+                idx, args = event
+                kw = {}
+            else:
+                idx, args, kw = event
+
+            yield self.names[idx], args, kw
+
+    def __len__(self):
+        return len(self.events)
+
+    def replay(self, compiler:Compiler):
+        """
+        Make the calls recorded on `compiler`. In place of the parser,
+        begin_document() is passed a ReplayParser object.
+        """
+        parser = ReplayParser()
+        for name, args, kw in self:
+            if name == "begin_document":
+                compiler.begin_document(parser)
+            else:
+                getattr(compiler, name)(*args, **kw)
+
+    def dumps(self) -> str:
+        def default(o):
+            if isinstance(o, Language):
+                return { "__language__": [o.iso, o.tsearch_configuration] }
+            else:
+                raise TypeError(f"Can’t serialize {repr(o)} in "
+                                "an EventStream.")
+
+        return json.dumps({ "names": self.names,
+                            "events": self.events },
+                          default=default, separators=(",", ":",),
+                          ensure_ascii=False)
+
+    @classmethod
+    def loads(EventStream, s:str):
+        def object_hook(d):
+            if "__language__" in d:
+                return Language(*d["__language__"])
+            else:
+                return d
+
+        data = json.loads(s, object_hook=object_hook)
+        return EventStream(data["names"], data["events"])
+
+class ReplayParser(object):
+    """
+    Stand-in for the parser while an EventStream is replayed. There
+    is no source to point at, so the location is always None.
+    """
+    location = None
@@ -12,14 +12,92 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
 # GNU General Public License for more details.
 
+import re, secrets, contextlib, contextvars
+
 from ll.xist.ns import html
 
 from .exceptions import UnknownLanguage
 from .language import Language, Languages
 from .macro import MacroLibrary
+from .utils import html_element
+
+## Link batches
+class LinkBatch(object):
+    """
+    The links Context.html_link() created for one document since
+    Context.begin_link_batch(). The output carries placeholders for
+    them, which resolve() replaces by the links after looking up all
+    their targets in one call to Context.lookup_link_targets().
+    """
+    def __init__(self, context):
+        self.context = context
+        self.token = secrets.token_hex(4)
+        self.links = []
+
+        # Link targets mapped to whether they exist, once looked up.
+        self.exists = None
+
+        # Returned by contextvars.ContextVar.set() while active.
+        self._var_token = None
+
+        # Writers whose content hash waits for the links.
+        self._writers = []
+
+    def placeholder(self, target, text) -> str:
+        self.links.append( (target, text,) )
+        return f"\x00{self.token}:{len(self.links)-1}\x00"
+
+    def lookup(self):
+        if self.exists is None:
+            targets = { target for target, text in self.links }
+            if targets:
+                self.exists = self.context.lookup_link_targets(targets)
+            else:
+                self.exists = {}
+
+    def digest_later(self, writer):
+        """
+        Called by a Writer’s end_document() if its output was hashed
+        during this batch. resolve() will call its resolve_digest().
+        """
+        self._writers.append(writer)
+
+    def substitute(self, output:str) -> str:
+        self.lookup()
+
+        def link(match):
+            target, text = self.links[int(match.group(1))]
+            return self.context.resolved_html_link(
+                target, text, self.exists.get(target, True))
+
+        return re.sub(f"\x00{self.token}:(\\d+)\x00", link, output)
+
+    def resolve(self, output:str) -> str:
+        """
+        Return `output` with the placeholders replaced by the links and
+        set the digest of the Writers hashing during this batch.
+        """
+        for writer in self._writers:
+            writer.resolve_digest(self.substitute)
+        self._writers = []
+
+        return self.substitute(output)
+
+_current_link_batch = contextvars.ContextVar("tinymarkup_link_batch",
+                                             default=None)
+
+def current_link_batch() -> LinkBatch:
+    """
+    The LinkBatch active in this thread or task or None.
+    """
+    return _current_link_batch.get()
 
 ## Context
 class Context(object):
+    # A tinymarkup.budget.Budget object limiting each document’s
+    # compilation or None.
+    budget = None
+
     def __init__(self,
                  macro_library:MacroLibrary=MacroLibrary(),
                  languages:Languages=Languages()):
@@ -30,6 +108,113 @@ class Context(object):
     def html_link_element(self, target, text):
         return html.a(text, href=target, class_="t4wiki-link")
 
+    def missing_html_link_element(self, target, text):
+        """
+        Return the element for a link to a target that does not exist
+        (see lookup_link_targets()). By default html_link_element()’s
+        with the “t4wiki-missing” class added.
+        """
+        element = self.html_link_element(target, text)
+        classes = str(element.attrs["class"])
+        element.attrs["class"] = " ".join(filter(None, [ classes,
+                                                        "t4wiki-missing" ]))
+        return element
+
+    def html_link(self, target, text) -> str:
+        """
+        Return the link html_link_element() creates as a string. Unless
+        a subclass overloads html_link_element() or
+        missing_html_link_element(), no xsc element is built. Compilers
+        that only print() links should use this.
+
+        Between begin_link_batch() and end_link_batch() this returns a
+        placeholder that end_link_batch() will replace.
+        """
+        batch = _current_link_batch.get()
+        if batch is not None and batch.context is self:
+            return batch.placeholder(target, text)
+        else:
+            return self.resolved_html_link(target, text, True)
+
+    def resolved_html_link(self, target, text, exists:bool) -> str:
+        """
+        Called by html_link() with `exists` set to True and by
+        end_link_batch() with the result of lookup_link_targets().
+        Links to targets that do not exist are created by
+        missing_html_link_element().
+        """
+        cls = type(self)
+        if ( cls.html_link_element is not Context.html_link_element
+             or cls.missing_html_link_element
+                 is not Context.missing_html_link_element ):
+            if exists:
+                return self.html_link_element(target, text).string()
+            else:
+                return self.missing_html_link_element(target, text).string()
+        elif exists:
+            return html_element("a", text, href=target,
+                                class_="t4wiki-link")
+        else:
+            return html_element("a", text, href=target,
+                                class_="t4wiki-link t4wiki-missing")
+
+    def lookup_link_targets(self, targets:set) -> dict:
+        """
+        Return a dict mapping each of the link `targets` to a boolean
+        indicating whether it exists. This is called once per link
+        batch with all its targets. Overload this to query your backing
+        store. By default all targets exist.
+        """
+        return dict.fromkeys(targets, True)
+
+    def begin_link_batch(self) -> LinkBatch:
+        """
+        Start collecting the links html_link() creates in this thread
+        or task. Compile the document, then pass the output to
+        end_link_batch(). Prefer the link_batch() context manager, which
+        makes sure the batch ends even if the compilation fails.
+        """
+        batch = LinkBatch(self)
+        batch._var_token = _current_link_batch.set(batch)
+        return batch
+
+    @contextlib.contextmanager
+    def link_batch(self):
+        """
+        Context manager for begin_link_batch(). Call end_link_batch()
+        within the with-block:
+
+           with context.link_batch():
+               compiler.compile(parser, source)
+               html = context.end_link_batch(output.getvalue())
+
+        If the block is left by an exception, the batch is dropped.
+        """
+        batch = self.begin_link_batch()
+        try:
+            yield batch
+        finally:
+            if batch._var_token is not None:
+                _current_link_batch.reset(batch._var_token)
+                batch._var_token = None
+
+    def end_link_batch(self, output:str) -> str:
+        """
+        Resolve the link targets collected since begin_link_batch() in
+        one call to lookup_link_targets() and return `output` with the
+        placeholders replaced by the links. Writers with a content hash
+        created during the batch get their `digest` now.
+        """
+        batch = _current_link_batch.get()
+        if batch is None or batch.context is not self:
+            raise RuntimeError("end_link_batch() without a link batch "
+                               "begun on this context.")
+
+        _current_link_batch.reset(batch._var_token)
+        batch._var_token = None
+
+        return batch.resolve(output)
+
     def register_language(self, language:Language):
         self.languages.register(language)
 
@@ -55,6 +55,14 @@ class MarkupError(Exception):
         self.location = location
         self.filepath = filepath
 
+    def __reduce__(self):
+        # Keep location, filepath and whatever else a subclass stores
+        # when passed between processes. Subclasses may have an
+        # __init__() with other parameters, so it is not called.
+        return ( self.__class__.__new__,
+                 ( self.__class__, *self.args, ),
+                 self.__dict__, )
+
     @property
     def lineno(self):
         if self.location:
@@ -124,6 +132,13 @@ class UnsuitableMacro(MarkupError):
 class RestrictionError(MarkupError):
     pass
 
+class BudgetExceeded(MarkupError):
+    """
+    Raised when a compilation runs out of one of the resources
+    configured in a tinymarkup.budget.Budget object.
+    """
+    pass
+
 class MacroError(MarkupError):
     """
     To be used by a macro’s methods.
@@ -0,0 +1,180 @@
+# Copyright (C) 2023 Diedrich Vorberg
+#
+# Contact: diedrich@tux4web.de
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+import bisect, dataclasses
+
+from .budget import tracking
+from .context import Context
+from .utils import SourceChunk, split_paragraphs
+from .parallel import compile_chunk
+
+class IncrementalResult(object):
+    """
+    The result of compiling a document paragraph by paragraph, kept
+    around so that after an edit only the paragraphs it touched need to
+    be compiled again:
+
+       result = IncrementalResult(compile_function, context, source,
+                                  is_safe_break)
+       ...
+       result = result.edit(offset, deleted, inserted)
+       preview = result.output
+
+    `compile_function(context, source)` returns the output for a run of
+    paragraphs as a string (cf. parallel.compile_parallel()). The
+    `is_safe_break` callback is required as for compile_parallel() and
+    works as in utils.split_paragraphs(), but after an edit only sees
+    the source of the paragraphs around it.
+
+    If the `context` has a budget, it applies to the document as a
+    whole. What each paragraph spent is remembered, so an edit is
+    checked against the budget minus what the re-used paragraphs spent.
+    """
+    def __init__(self, compile_function, context:Context, source:str,
+                 is_safe_break, _chunks=None, _outputs=None,
+                 _spent=None):
+        self.compile_function = compile_function
+        self.context = context
+        self.source = source
+        self.is_safe_break = is_safe_break
+
+        if _chunks is None:
+            self.chunks = split_paragraphs(source, 0, is_safe_break)
+            tracker = self._start_budget(())
+            self.outputs, self.spent = [], []
+            for chunk in self.chunks:
+                output, spent = self._compile(chunk, tracker)
+                self.outputs.append(output)
+                self.spent.append(spent)
+        else:
+            self.chunks = _chunks
+            self.outputs = _outputs
+            self.spent = _spent
+
+    def _start_budget(self, spent):
+        """
+        Return a new tracker for the context’s budget that has been
+        charged what the re-used paragraphs `spent`, or None.
+        """
+        if self.context.budget is None:
+            return None
+
+        tracker = self.context.budget.start()
+        for s in spent:
+            if s is not None:
+                tracker.charge(s)
+        return tracker
+
+    def _compile(self, chunk:SourceChunk, tracker):
+        """
+        Return the output for `chunk` and what it spent of the budget.
+        """
+        if tracker is None:
+            return ( compile_chunk(self.compile_function,
+                                   self.context, chunk), None, )
+
+        before = tracker.spent
+        with tracking(tracker):
+            output = compile_chunk(self.compile_function,
+                                   self.context, chunk)
+        spent = tuple( b - a for a, b in zip(before, tracker.spent) )
+
+        return ( output, spent, )
+
+    @property
+    def output(self) -> str:
+        return "".join(self.outputs)
+
+    def edit(self, offset:int, deleted:int, inserted:str):
+        """
+        Return a new IncrementalResult for the source with `deleted`
+        characters at `offset` replaced by `inserted`. The paragraphs
+        touched by the edit and their neighbours are split and compiled
+        again. All other outputs are re-used.
+        """
+        old = self.source
+        source = old[:offset] + inserted + old[offset+deleted:]
+
+        if not self.chunks:
+            return self.__class__(self.compile_function, self.context,
+                                  source, self.is_safe_break)
+
+        edit_end = offset + deleted
+        delta = len(inserted) - deleted
+        line_delta = inserted.count("\n") - old.count("\n", offset, edit_end)
+
+        # The chunks touched by the edit plus one on either side, because
+        # the edit may have added or removed the paragraph break between
+        # them.
+        starts = [ chunk.start for chunk in self.chunks ]
+        ends = [ chunk.end for chunk in self.chunks ]
+        first = max(bisect.bisect_left(ends, offset) - 1, 0)
+        last = min(bisect.bisect_right(starts, edit_end),
+                   len(self.chunks)-1)
+
+        # The whitespace before the first and after the last chunk
+        # belongs to them for this purpose.
+        if first == 0:
+            region_start = 0
+            line_offset = 0
+        else:
+            region_start = min(self.chunks[first].start, offset)
+            line_offset = ( self.chunks[first].line_offset
+                            - old.count("\n", region_start,
+                                        self.chunks[first].start) )
+
+        if last == len(self.chunks) - 1:
+            region_end = len(source)
+        else:
+            region_end = max(self.chunks[last].end, edit_end) + delta
+
+        known = dict(zip(( chunk.source
+                           for chunk in self.chunks[first:last+1] ),
+                         zip(self.outputs[first:last+1],
+                             self.spent[first:last+1])))
+
+        kept = self.spent[:first] + self.spent[last+1:]
+        tracker = self._start_budget(kept)
+
+        chunks = []
+        outputs = []
+        spents = []
+        for chunk in split_paragraphs(source[region_start:region_end],
+                                      0, self.is_safe_break):
+            chunk.start += region_start
+            chunk.end += region_start
+            chunk.line_offset += line_offset
+            chunks.append(chunk)
+
+            output, spent = known.get(chunk.source, ( None, None, ))
+            if output is None:
+                output, spent = self._compile(chunk, tracker)
+            elif tracker is not None and spent is not None:
+                tracker.charge(spent)
+            outputs.append(output)
+            spents.append(spent)
+
+        following = [ dataclasses.replace(
+            chunk,
+            start=chunk.start+delta,
+            end=chunk.end+delta,
+            line_offset=chunk.line_offset+line_delta)
+                      for chunk in self.chunks[last+1:] ]
+
+        return self.__class__(
+            self.compile_function, self.context, source,
+            self.is_safe_break,
+            _chunks=self.chunks[:first] + chunks + following,
+            _outputs=self.outputs[:first] + outputs + self.outputs[last+1:],
+            _spent=self.spent[:first] + spents + self.spent[last+1:])
@@ -18,17 +18,38 @@ import re, dataclasses
 from .exceptions import UnknownLanguage
 
 ## Languages
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True, slots=True, eq=False)
 class Language(object):
     iso: str
     tsearch_configuration: str
+    _hash: int = dataclasses.field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Language objects are hashed and compared for every word
+        # written by the TSearchWriter. Compute the hash only once.
+        object.__setattr__(self, "_hash", hash(self.config_string))
 
     @property
     def config_string(self):
         return f"{self.iso}:{self.tsearch_configuration}"
 
     def __hash__(self):
-        return hash(self.config_string)
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        elif not isinstance(other, Language):
+            return NotImplemented
+        else:
+            return ( self.iso == other.iso
+                     and self.tsearch_configuration
+                           == other.tsearch_configuration )
+
+    def __reduce__(self):
+        # str hashes differ between interpreters. Don’t pickle _hash,
+        # have it re-computed on unpickling.
+        return ( self.__class__, (self.iso, self.tsearch_configuration,), )
 
     @property
     def ui_name(self):
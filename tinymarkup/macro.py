@@ -15,7 +15,9 @@
 
 import inspect, functools, html, dataclasses
 
-from .exceptions import UnknownLanguage, UnknownMacro, UnsuitableMacro
+from .exceptions import (UnknownLanguage, UnknownMacro, UnsuitableMacro,
+                         MarkupError)
+from .budget import count_macro_call
 
 class Macro(object):
     """
@@ -27,6 +29,11 @@ class Macro(object):
     # This determins where a macro may be used. Checked by __init__().
     environments = { "block", "inline" }
 
+    # Macros that keep no state between calls may set this to True. The
+    # MacroLibrary’s instantiate() will then re-use one instance per
+    # context and environment.
+    stateless = False
+
     @classmethod
     def check_environment(Macro, environment):
         """
@@ -57,20 +64,65 @@ class Macro(object):
         else:
             return ""
 
+    # MacroLibrary.instantiate() creates instances with this set, after
+    # its dispatch table has checked the environment and got the name.
+    _checked = False
+
     def __init__(self, context, environment):
-        self.name = self.get_name()
+        if not self._checked:
+            self.name = self.get_name()
+            self.check_environment(environment)
+
         self.context = context
 
-        self.check_environment(environment)
+        count_macro_call()
+
         self._environment = environment
 
 class MacroLibrary(dict):
+    # Environments the dispatch table is filled for on registration.
+    # Others are added on first use.
+    default_environments = { "block", "inline" }
+
     def __init__(self, *macros):
         super().__init__()
 
+        # Map ( name, environment, ) to ( macro_class, macro_name, error, ),
+        # error being None or the ( exception class, message, ) raised
+        # by the macro class’ check_environment(). Entries are only used
+        # while macro_class is still the one registered as name.
+        self._dispatch = {}
+
+        # Map ( name, environment, ) to instances of stateless macros.
+        self._instances = {}
+
         for macro in macros:
             self.register(macro)
 
+    def __setitem__(self, name, macro_class):
+        super().__setitem__(name, macro_class)
+        self._forget(name)
+
+    def __delitem__(self, name):
+        super().__delitem__(name)
+        self._forget(name)
+
+    def _forget(self, name):
+        # The tables don’t exist yet while a library is being unpickled.
+        dispatch = self.__dict__.get("_dispatch", None)
+        if dispatch:
+            for key in [ key for key in dispatch if key[0] == name ]:
+                del dispatch[key]
+                self._instances.pop(key, None)
+
+    def __copy__(self):
+        ret = self.__class__()
+        dict.update(ret, self)
+        ret.__dict__.update(self.__dict__)
+        ret._dispatch = self._dispatch.copy()
+        ret._instances = {}
+        return ret
+
     def register(self, macro_class:type[Macro], update=False):
         """
         Register a macro class with this library using its “name” attribute
@@ -82,17 +134,86 @@ class MacroLibrary(dict):
         else:
             self[name] = macro_class
 
+            for environment in ( self.default_environments
+                                 | set(macro_class.environments) ):
+                self._dispatch[(name, environment)] = self._dispatch_entry(
+                    macro_class, environment)
+
+    @staticmethod
+    def _dispatch_entry(macro_class, environment):
+        try:
+            macro_class.check_environment(environment)
+        except MarkupError as exc:
+            error = ( exc.__class__, exc.message, )
+        else:
+            error = None
+
+        return ( macro_class, macro_class.get_name(), error, )
+
     def register_module(self, module, update=False):
         for item in module.values():
             if type(item) == type and issubclass(item, Macro):
                 self.register(item, update)
 
     def get(self, name, location):
-        if name not in self:
+        try:
+            return self[name]
+        except KeyError:
             raise UnknownMacro(f"Macro named “{name}” not found.",
                                location=location)
 
-        return self[name]
+    def lookup(self, name, environment, location=None):
+        """
+        Return the macro class registered as `name` after making sure
+        it may be used in `environment`, using the dispatch table.
+        Raises UnknownMacro or whatever the macro class’
+        check_environment() raises.
+        """
+        return self._lookup(name, environment, location)[0]
+
+    def _lookup(self, name, environment, location):
+        key = ( name, environment, )
+        entry = self._dispatch.get(key, None)
+
+        # dict.update(), pop() and the like bypass __setitem__() and
+        # __delitem__(), so make sure the entry is still current.
+        if entry is None or dict.get(self, name, None) is not entry[0]:
+            entry = self._dispatch[key] = self._dispatch_entry(
+                self.get(name, location), environment)
+
+        macro_class, macro_name, error = entry
+        if error is not None:
+            exception_class, message = error
+            raise exception_class(message, location=location)
+
+        return entry
+
+    def instantiate(self, name, context, environment, location=None):
+        """
+        Return a Macro object for `name` to be used in `environment`.
+        Instances of stateless macros are re-used for the same context.
+        """
+        key = ( name, environment, )
+        macro = self._instances.get(key, None)
+        if ( macro is not None
+             and macro.context is context
+             and dict.get(self, name, None) is macro.__class__ ):
+            count_macro_call()
+            return macro
+
+        macro_class, macro_name, error = self._lookup(name, environment,
+                                                      location)
+
+        # The dispatch table has checked the environment already.
+        macro = macro_class.__new__(macro_class)
+        macro._checked = True
+        macro.name = macro_name
+        macro.__init__(context, environment)
+
+        if macro_class.stateless:
+            self._instances[key] = macro
+
+        return macro
 
     def extend(self, other, update=False):
         for item in other.values():
@@ -0,0 +1,116 @@
+# Copyright (C) 2023 Diedrich Vorberg
+#
+# Contact: diedrich@tux4web.de
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+import copy, itertools, concurrent.futures
+
+from .budget import BudgetTracker, tracking
+from .context import Context
+from .exceptions import MarkupError
+from .utils import SourceChunk, split_paragraphs
+
+def compile_chunk(compile_function, context:Context, chunk:SourceChunk):
+    """
+    Return `compile_function(context, chunk.source)`. Line numbers of
+    MarkupErrors are adjusted to the document the chunk was cut from.
+    """
+    try:
+        return compile_function(context, chunk.source)
+    except MarkupError as exc:
+        if exc.location is not None:
+            exc.location.lineno += chunk.line_offset
+        raise
+
+def compile_chunk_tracked(compile_function, context:Context,
+                          chunk:SourceChunk, tracker:BudgetTracker):
+    """
+    Compile the `chunk` in a worker process under its copy of the
+    document’s BudgetTracker. Returns the output and what was spent, for
+    the parent to charge to the document’s tracker.
+    """
+    if tracker is None:
+        return ( compile_chunk(compile_function, context, chunk), None, )
+
+    with tracking(tracker):
+        output = compile_chunk(compile_function, context, chunk)
+
+    return ( output, tracker.spent, )
+
+def compile_parallel(compile_function, context:Context, source:str,
+                     is_safe_break, min_chunk_size:int=32768,
+                     executor:concurrent.futures.Executor=None,
+                     max_workers:int=None) -> str:
+    """
+    Compile a large document on several cores. `source` is split at
+    paragraph breaks (see utils.split_paragraphs()) into chunks of at
+    least `min_chunk_size` characters. `is_safe_break(source, match)`
+    is required: only the markup knows whether a blank line ends a
+    paragraph at the top level or lies within, say, a table or a code
+    block, and splitting there would change the output.
+
+    Each chunk is compiled by `compile_function(context, source)` in a
+    worker process and the results are concatenated in order. This
+    works for output that may be concatenated, like HTMLWriter’s, but
+    not for TSearchWriter’s.
+
+    `compile_function` and `context` must be picklable, i.e.
+    `compile_function` must be a module-level function. Pass an
+    `executor` to re-use a process pool; otherwise one is created with
+    `max_workers` processes for this call.
+
+    If the `context` has a budget, it applies to the document as a
+    whole. Each worker counts against a copy of the document’s
+    tracker, what it spent is charged to the document when its result
+    comes in.
+    """
+    chunks = split_paragraphs(source, min_chunk_size, is_safe_break)
+
+    if context.budget is None:
+        tracker = None
+    else:
+        tracker = context.budget.start()
+
+    if len(chunks) < 2:
+        if tracker is None:
+            return "".join( compile_chunk(compile_function, context, chunk)
+                            for chunk in chunks )
+        else:
+            with tracking(tracker):
+                return "".join( compile_chunk(compile_function,
+                                              context, chunk)
+                                for chunk in chunks )
+
+    if executor is None:
+        with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+            return _compile_in(executor, compile_function, context,
+                               chunks, tracker)
+    else:
+        return _compile_in(executor, compile_function, context,
+                           chunks, tracker)
+
+def _compile_in(executor, compile_function, context, chunks, tracker):
+    # Executor.map() submits all chunks right away, so each worker
+    # gets a copy of the tracker before anything has been charged to it.
+    results = executor.map(compile_chunk_tracked,
+                           itertools.repeat(compile_function),
+                           itertools.repeat(context),
+                           chunks,
+                           ( copy.copy(tracker) for chunk in chunks ))
+
+    outputs = []
+    for output, spent in results:
+        if tracker is not None:
+            tracker.charge(spent)
+        outputs.append(output)
+
+    return "".join(outputs)
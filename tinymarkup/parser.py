@@ -17,6 +17,7 @@ import copy
 import ply.lex
 
 from .exceptions import Location
+from .budget import current_tracker
 from .utils import get_remainder, set_remainder
 
 class Parser(object):
@@ -39,12 +40,18 @@ class LexerWrapper(object):
         self._source = source
         self.base.input(source.lstrip())
 
+        budget = current_tracker()
+        if budget is not None:
+            budget.lexer = self
+
         while True:
             token = self.base.token()
             if not token:
                 break
             else:
                 self._current_token = token
+                if budget is not None:
+                    budget.count_token()
                 yield token
 
     @property
@@ -0,0 +1,108 @@
+# Copyright (C) 2023 Diedrich Vorberg
+#
+# Contact: diedrich@tux4web.de
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+import os, stat, json, socketserver
+
+from .exceptions import MarkupError
+
+class CompileServer(object):
+    """
+    Long-running compiler process that keeps its context, macro modules
+    and lexers warm. Requests and responses are JSON objects, one per
+    line. A request looks like
+
+       {"id": 1, "source": "…", "format": "html", "language": "en"}
+
+    where all keys except “source” are optional. The response carries
+    the same “id” and either the “output” or an “error” with “type”,
+    “message”, “lineno” and “looking_at”.
+    """
+    def __init__(self, compile_function):
+        """
+        `compile_function(source, format, language)` returns the output
+        as a string. `format` and `language` are None if not requested.
+        """
+        self.compile_function = compile_function
+
+    def handle(self, request:dict) -> dict:
+        response = { "id": request.get("id", None) }
+
+        try:
+            response["output"] = self.compile_function(
+                request["source"],
+                request.get("format", None),
+                request.get("language", None))
+        except MarkupError as exc:
+            response["error"] = { "type": exc.__class__.__name__,
+                                  "message": exc.message,
+                                  "lineno": exc.lineno,
+                                  "looking_at": exc.looking_at, }
+        except Exception as exc:
+            response["error"] = { "type": exc.__class__.__name__,
+                                  "message": str(exc),
+                                  "lineno": None,
+                                  "looking_at": None, }
+
+        return response
+
+    def handle_line(self, line:str) -> str:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object.")
+        except ValueError as exc:
+            response = { "id": None,
+                         "error": { "type": "BadRequest",
+                                    "message": str(exc),
+                                    "lineno": None,
+                                    "looking_at": None, } }
+        else:
+            response = self.handle(request)
+
+        return json.dumps(response, ensure_ascii=False) + "\n"
+
+    def serve_jsonlines(self, infile, outfile):
+        """
+        Answer requests read from `infile` on `outfile` until EOF.
+        """
+        for line in infile:
+            if line.strip():
+                outfile.write(self.handle_line(line))
+                outfile.flush()
+
+    def serve_unix_socket(self, path:str):
+        """
+        Listen on the Unix domain socket at `path`. Connections are
+        handled one after the other, each until the client closes it.
+        """
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    line = line.decode("utf-8")
+                    if line.strip():
+                        self.wfile.write(
+                            server.handle_line(line).encode("utf-8"))
+                        self.wfile.flush()
+
+        # Remove a stale socket left behind by a previous server.
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+
+        with socketserver.UnixStreamServer(path, Handler) as unix_server:
+            try:
+                unix_server.serve_forever()
+            finally:
+                os.unlink(path)
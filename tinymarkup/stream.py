@@ -0,0 +1,179 @@
+# Copyright (C) 2023 Diedrich Vorberg
+#
+# Contact: diedrich@tux4web.de
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+"""
+Pull-based compiler output. The parsers drive the compilers, which
+write to a file object. The functions in this module run such a
+compilation in a worker thread and hand the output to the caller in
+chunks as soon as they are produced, so that a web application can
+start sending a long page before it has been compiled completely:
+
+    def write_to(output):
+        compiler = HTMLCompiler(context, output)
+        compiler.compile(parser, source)
+
+    return iter_output(write_to) # A WSGI iterable.
+"""
+
+import threading, queue, asyncio
+
+class _Cancelled(Exception):
+    """
+    Raised in the worker thread if the consumer stopped iterating.
+    """
+    pass
+
+class _Failure(object):
+    def __init__(self, exception):
+        self.exception = exception
+
+_end = object()
+
+class _Producer(object):
+    """
+    The worker thread running `write_to(output)` and the bounded queue
+    it passes its chunks through. Neither side ever blocks for good:
+    both poll the `cancelled` event while waiting on the queue.
+    """
+    poll_interval = 0.05
+
+    def __init__(self, write_to, chunk_size:int, max_chunks:int):
+        self.chunks = queue.Queue(max_chunks)
+        self.cancelled = threading.Event()
+        self.output = ChunkedOutput(self, chunk_size)
+        self._write_to = write_to
+
+        self.thread = threading.Thread(target=self._produce, daemon=True)
+        self.thread.start()
+
+    def _produce(self):
+        try:
+            self._write_to(self.output)
+            self.output.flush()
+            self.put(_end)
+        except _Cancelled:
+            pass
+        except BaseException as exc:
+            try:
+                self.put(_Failure(exc))
+            except _Cancelled:
+                pass
+
+    def put(self, item):
+        """
+        Called by the worker. Raises _Cancelled if the consumer is gone.
+        """
+        while True:
+            if self.cancelled.is_set():
+                raise _Cancelled()
+            try:
+                self.chunks.put(item, timeout=self.poll_interval)
+                return
+            except queue.Full:
+                pass
+
+    def get(self):
+        """
+        Called by the consumer. Returns the next chunk, _end or a
+        _Failure. Returns _end if the consumer cancelled meanwhile.
+        """
+        while True:
+            if self.cancelled.is_set():
+                return _end
+            try:
+                return self.chunks.get(timeout=self.poll_interval)
+            except queue.Empty:
+                pass
+
+    def cancel(self):
+        self.cancelled.set()
+
+class ChunkedOutput(object):
+    """
+    File-like object that collects the strings written to it and
+    passes them on as chunks of at least `chunk_size` characters.
+    """
+    def __init__(self, producer:_Producer, chunk_size:int):
+        self.chunk_size = chunk_size
+        self._producer = producer
+        self._buffer = []
+        self._size = 0
+
+    def write(self, s:str):
+        if self._producer.cancelled.is_set():
+            raise _Cancelled()
+
+        self._buffer.append(s)
+        self._size += len(s)
+
+        if self._size >= self.chunk_size:
+            self.flush()
+
+        return len(s)
+
+    def flush(self):
+        if self._buffer:
+            chunk = "".join(self._buffer)
+            self._buffer = []
+            self._size = 0
+            self._producer.put(chunk)
+
+def _chunk(item):
+    if isinstance(item, _Failure):
+        raise item.exception
+    else:
+        return item
+
+def iter_output(write_to, chunk_size:int=8192, max_chunks:int=16):
+    """
+    Call `write_to(output)` in a worker thread and yield what it writes
+    to `output` in chunks of about `chunk_size` characters. No more than
+    `max_chunks` chunks are kept waiting, the worker blocks if the
+    consumer is slower than the compiler. Exceptions raised by
+    `write_to`, MarkupErrors in particular, are raised by this generator.
+    If the generator is closed early, the worker gives up at its next
+    write.
+    """
+    producer = _Producer(write_to, chunk_size, max_chunks)
+
+    try:
+        while True:
+            chunk = _chunk(producer.get())
+            if chunk is _end:
+                break
+            else:
+                yield chunk
+    finally:
+        producer.cancel()
+
+async def aiter_output(write_to, chunk_size:int=8192, max_chunks:int=16):
+    """
+    Asynchronous version of iter_output() for ASGI applications. The
+    compilation runs in a worker thread, the event loop is not blocked.
+    If the consuming task is cancelled, e.g. because the client went
+    away, the worker is cancelled, too.
+    """
+    loop = asyncio.get_running_loop()
+    producer = _Producer(write_to, chunk_size, max_chunks)
+
+    try:
+        while True:
+            chunk = _chunk(await loop.run_in_executor(None, producer.get))
+            if chunk is _end:
+                break
+            else:
+                yield chunk
+    finally:
+        # The executor’s producer.get() returns once this is set.
+        producer.cancel()
@@ -13,11 +13,14 @@
 # GNU General Public License for more details.
 
 
-import html, copy, dataclasses, re
+import html, copy, dataclasses, re, functools
 
 import ply.lex
+from ll import misc, url
+from ll.xist import xsc
 
 from .exceptions import Location
+from .res import paragraph_break_re
 
 def html_start_tag(tag, **params):
     def fixkey(key):
@@ -35,6 +38,43 @@ def html_start_tag(tag, **params):
 
     return f"<{tag}{params}>"
 
+# Attributes XIST’s html namespace declares as URLAttr. Their values
+# are normalized and percent-encoded on output.
+url_attributes = { "href", "src", "action", "cite", "formaction",
+                   "poster", "background", "longdesc", "usemap", }
+
+@functools.lru_cache(maxsize=4096)
+def quote_url(value:str) -> str:
+    """
+    Return `value` percent-encoded the way XIST’s URLAttr publishes it.
+    Parsing the URL is slow and links repeat a lot, hence the cache.
+    """
+    return str(url.URL(value))
+
+def html_element(tag, content, **params):
+    """
+    Return an HTML element as a string, the way building and serializing
+    an xsc element would, but without the overhead. `content` is either
+    a string, which will be escaped, or an xsc node.
+    """
+    if isinstance(content, xsc.Node):
+        content = content.string()
+    else:
+        content = misc.xmlescape_text(str(content))
+
+    attributes = []
+    for key, value in params.items():
+        if key.endswith("_"):
+            key = key[:-1]
+        key = key.replace("_", "-")
+
+        value = str(value)
+        if key in url_attributes:
+            value = quote_url(value)
+
+        attributes.append(f' {key}="{misc.xmlescape_attr(value)}"')
+
+    return f"<{tag}{''.join(attributes)}>{content}</{tag}>"
 
 def get_remainder(lexer:ply.lex.Lexer) -> str:
     return lexer.lexdata[lexer.lexpos:]
@@ -56,3 +96,48 @@ def parse_tag_params(params):
     return dict([ (name, single or double,)
                   for (name, single, double)
                     in param_re.findall(params) ])
+
+@dataclasses.dataclass
+class SourceChunk:
+    """
+    A run of paragraphs cut out of a larger document. `start` and `end`
+    are offsets into that document, `line_offset` is the number of
+    lines before `start`.
+    """
+    source: str
+    start: int
+    end: int
+    line_offset: int
+
+def split_paragraphs(source:str, min_size:int=0, is_safe_break=None):
+    """
+    Split `source` at res.paragraph_break_re into SourceChunk objects
+    of at least `min_size` characters. The paragraph breaks themselves
+    are not part of any chunk and neither are chunks that contain
+    nothing but whitespace. If given, `is_safe_break(source, match)`
+    decides which breaks may be used, as whether a blank line ends a
+    paragraph at the top level depends on the markup.
+    """
+    chunks = []
+    start = 0
+    line_offset = 0
+
+    def append(end):
+        if source[start:end].strip():
+            chunks.append(SourceChunk(source[start:end], start, end,
+                                      line_offset))
+
+    for match in paragraph_break_re.finditer(source):
+        if match.start() - start < min_size:
+            continue
+
+        if is_safe_break is not None and not is_safe_break(source, match):
+            continue
+
+        append(match.start())
+        line_offset += source.count("\n", start, match.end())
+        start = match.end()
+
+    append(len(source))
+
+    return chunks
@@ -0,0 +1,78 @@
+# Copyright (C) 2023 Diedrich Vorberg
+#
+# Contact: diedrich@tux4web.de
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+import gc, importlib
+
+from .context import Context
+
+# Importing these compiles their regular expressions (param_re,
+# config_string_re, paragraph_break_re, …) and loads ply and XIST.
+modules = ( "tinymarkup.res",
+            "tinymarkup.exceptions",
+            "tinymarkup.utils",
+            "tinymarkup.language",
+            "tinymarkup.macro",
+            "tinymarkup.context",
+            "tinymarkup.parser",
+            "tinymarkup.compiler",
+            "tinymarkup.writer",
+            "tinymarkup.budget",
+            "tinymarkup.stream",
+            "tinymarkup.parallel",
+            "tinymarkup.incremental",
+            "tinymarkup.server",
+            "tinymarkup.cmdline", )
+
+def warm_up(context:Context=None, macro_modules=(), lexers=(),
+            freeze:bool=True):
+    """
+    Do everything a prefork server’s workers would otherwise do lazily
+    and each on their own, in the parent process before it forks:
+
+    - import tinymarkup’s modules and thereby compile their regexes
+    - import the `macro_modules` (module objects or dotted names) and
+      extend the `context`’s macro library by their macro_library
+    - call the `lexers`, functions returning a ply lexer like
+      ply.lex.lex() does, so the lexer tables are built
+    - serialize a link through XIST once, initializing its internals
+    - collect garbage and, if `freeze` is set, gc.freeze() all objects
+      that exist now, so the workers’ garbage collector never touches
+      (and copies) the pages they live on
+
+    Returns the list of lexers built, to be passed to your Parser
+    objects in the workers. Raises ValueError if `macro_modules` are
+    given without a `context` to add them to.
+    """
+    if macro_modules and context is None:
+        raise ValueError("warm_up() needs a context to add the "
+                         "macro_modules to.")
+
+    for name in modules:
+        importlib.import_module(name)
+
+    if context is not None:
+        for module in macro_modules:
+            if isinstance(module, str):
+                module = importlib.import_module(module)
+            context.macro_library.extend(module.macro_library, update=True)
+
+        context.html_link_element("warm-up", "warm-up").string()
+
+    built = [ lexer() for lexer in lexers ]
+
+    gc.collect()
+    if freeze:
+        gc.freeze()
+
+    return built
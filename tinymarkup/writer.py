@@ -12,6 +12,7 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
 # GNU General Public License for more details.
 
+import hashlib
 from html import escape as escape_html
 
 from ll.xist import xsc
@@ -19,18 +20,131 @@ from ll.xist import xsc
 from .language import Language
 from .exceptions import InternalError
 from .utils import html_start_tag
+from .budget import BudgetedOutput
+from .context import current_link_batch
 
 class Writer(object):
     """
     Baseclass for writer objects that manage compiler output.
     """
-    def __init__(self, output, root_language):
+    def __init__(self, output, root_language, content_hash=None):
+        """
+        The characters written to `output` count against the current
+        budget, if any (see tinymarkup.budget).
+
+        `content_hash` may be the name of a hashlib algorithm or a hash
+        object. It will be updated with the UTF-8 encoded output as it
+        is written and its hexdigest() will be available as `digest`
+        after end_document(), for ETags and change detection.
+
+        If the Writer is created during a link batch (see
+        Context.begin_link_batch()), links are written as placeholders.
+        The output is then hashed with the links in place of the
+        placeholders by Context.end_link_batch(), which sets `digest`.
+        """
+        if isinstance(content_hash, str):
+            content_hash = hashlib.new(content_hash)
+        self.content_hash = content_hash
+        self.digest = None
+
+        if content_hash is None:
+            self._hashing_output = None
+        else:
+            output = self._hashing_output = HashingOutput(
+                output, content_hash, current_link_batch())
+
+        output = BudgetedOutput(output)
+
         self.output = output
         self.root_language = root_language
 
     def print(self, *args, **kw):
         print(*args, **kw, file=self.output)
 
+    def end_document(self):
+        """
+        Called when all output has been written. Returns the
+        content hash’ digest, if any.
+        """
+        hashing_output = self._hashing_output
+        if hashing_output is not None:
+            if hashing_output.link_batch is None:
+                self.digest = self.content_hash.hexdigest()
+            else:
+                hashing_output.link_batch.digest_later(self)
+
+        return self.digest
+
+    def resolve_digest(self, substitute):
+        """
+        Called by the link batch with a function that replaces its
+        placeholders in a string. Hash the output written with them
+        replaced.
+        """
+        output = substitute("".join(self._hashing_output.chunks))
+        self.content_hash.update(output.encode("utf-8"))
+        self.digest = self.content_hash.hexdigest()
+
+class HashingOutput(object):
+    """
+    Wrap a Writer’s output file object to hash what is written to it.
+    During a `link_batch` the output is collected instead, to be hashed
+    when the batch’s placeholders have been resolved.
+    """
+    def __init__(self, output, content_hash, link_batch=None):
+        self._output = output
+        self._content_hash = content_hash
+        self.link_batch = link_batch
+        self.chunks = []
+
+    def write(self, s:str):
+        if self.link_batch is None:
+            self._content_hash.update(s.encode("utf-8"))
+        else:
+            self.chunks.append(s)
+
+        return self._output.write(s)
+
+    def __getattr__(self, name):
+        return getattr(self._output, name)
+
+def content_digest(output:str, content_hash="sha256") -> str:
+    """
+    Return the digest a Writer with `content_hash` would have computed
+    for `output`, e.g. for the result of Context.end_link_batch().
+    """
+    if isinstance(content_hash, str):
+        content_hash = hashlib.new(content_hash)
+
+    content_hash.update(output.encode("utf-8"))
+    return content_hash.hexdigest()
+
+class NullWriter(Writer):
+    """
+    Writer for the NullCompiler and anything else that needs to run a
+    compiler for its side effects only. Everything written is discarded.
+    """
+    def __init__(self, output=None, root_language=None):
+        super().__init__(output, root_language)
+
+    def print(self, *args, **kw):
+        pass
+
+    def open(self, tag, **params):
+        pass
+
+    def close(self, tag):
+        pass
+
+    def close_all(self):
+        pass
+
+    def text(self, s:str):
+        pass
+
+    def write(self, *args, **kw):
+        pass
+
 class HTMLWriter(Writer):
     """
     HTMLCompiler output manager.
@@ -44,18 +158,79 @@ class HTMLWriter(Writer):
     loner_tags = { "div", "ol", "ul", "code",
                    "table", "tbody", "thead", "tr", "dl" }
 
-    def __init__(self, output, root_language):
-        super().__init__(output, root_language)
+    # End tags HTML allows to leave out in our output, because the
+    # only things that may follow them are a sibling or the parent’s
+    # end tag. Omitted in “compact” layout.
+    optional_end_tags = { "li", "dt", "dd", "tr", "td", "th", }
+
+    # Whitespace is significant inside these, “pretty” won’t add any
+    # and “compact” won’t remove any.
+    preformatted_tags = { "code", "pre", }
+
+    # “default” puts loner tags and block level end tags on a line by
+    # themselves, “compact” adds no whitespace and leaves out optional
+    # end tags, “pretty” also indents nested block level elements.
+    layouts = { "default", "compact", "pretty", }
+
+    def __init__(self, output, root_language, layout:str="default",
+                 content_hash=None):
+        super().__init__(output, root_language, content_hash)
+
+        if layout not in self.layouts:
+            raise ValueError(f"Unknown layout: {repr(layout)}")
+        self.layout = layout
+
         self.tag_stack = []
+        self._text_run = []
+        self._line_start = True
+
+    def text(self, s:str):
+        """
+        Add plain text to the current text run. It will be escaped and
+        written in one piece before the next tag or print().
+        """
+        self._text_run.append(s)
+
+    def flush_text(self):
+        if self._text_run:
+            run = escape_html("".join(self._text_run), quote=False)
+            self.output.write(run)
+            self._text_run.clear()
+            self._line_start = run.endswith("\n")
+
+    def print(self, *args, sep=" ", end="\n", flush=False):
+        if self._text_run:
+            self.flush_text()
 
-    def print(self, *args, **kw):
         def convert(a):
-            if isinstance(a, xsc.Node):
+            if type(a) is str:
+                return a
+            elif isinstance(a, xsc.Node):
                 return a.string()
             else:
-                return a
-        args = [ convert(arg) for arg in args if arg is not None ]
-        print(*args, **kw, file=self.output)
+                return str(a)
+        s = sep.join([ convert(arg) for arg in args if arg is not None ]) + end
+
+        if s:
+            self.output.write(s)
+            self._line_start = s.endswith("\n")
+
+        if flush:
+            self.output.flush()
+
+    def _pretty(self):
+        return ( self.layout == "pretty"
+                 and self.preformatted_tags.isdisjoint(self.tag_stack) )
+
+    def _indent(self, depth):
+        """
+        Start a new line, if need be, indented for `depth` nested
+        loner tags.
+        """
+        if self._line_start:
+            return "  " * depth
+        else:
+            return "\n" + "  " * depth
 
     def open(self, tag, **params):
         # If we’re in a <p> and we’re opening a block level element,
@@ -63,21 +238,46 @@ class HTMLWriter(Writer):
         #if self.tag_stack and self.tag_stack[-1] == "p" \
         #   and tag in self.block_level_tags:
         #    self.close("p")
-        if tag in self.loner_tags:
+        start_tag = html_start_tag(tag, **params)
+
+        if ( self.layout == "compact"
+             and tag not in self.preformatted_tags
+             and self.preformatted_tags.isdisjoint(self.tag_stack) ):
+            end = ""
+        elif tag in self.loner_tags:
             end = "\n"
         else:
             end = ""
 
-        self.print(html_start_tag(tag, **params), end=end)
+        if tag in self.block_level_tags and self._pretty():
+            depth = len([ t for t in self.tag_stack if t in self.loner_tags ])
+            start_tag = self._indent(depth) + start_tag
+
+        self.print(start_tag, end=end)
         self.tag_stack.append(tag)
 
     def close(self, tag):
-        if tag in self.block_level_tags:
+        end_tag = f"</{tag}>"
+
+        if ( self.layout == "compact"
+             and self.preformatted_tags.isdisjoint(self.tag_stack[:-1]) ):
+            end = ""
+            if tag in self.optional_end_tags:
+                end_tag = ""
+        elif tag in self.block_level_tags:
             end = "\n"
         else:
             end = ""
 
-        self.print(f"</{tag}>", end=end)
+        if tag in self.block_level_tags and self._pretty():
+            depth = len([ t for t in self.tag_stack[:-1]
+                          if t in self.loner_tags ])
+            if tag in self.loner_tags:
+                end_tag = self._indent(depth) + end_tag
+            elif self._line_start:
+                end_tag = "  " * depth + end_tag
+
+        self.print(end_tag, end=end)
 
         if not self.tag_stack or self.tag_stack[-1] != tag:
             raise InternalError(f"Internal error. HTML nesting failed. "
@@ -86,6 +286,14 @@ class HTMLWriter(Writer):
         else:
             self.tag_stack.pop()
 
+    def end_document(self):
+        """
+        Write the pending text run, if any, so text after the last
+        tag isn’t lost.
+        """
+        self.flush_text()
+        return super().end_document()
+
     def close_all(self):
         """
         Close all HTML elements up to the last opened blockquote. <blockquote>
@@ -97,6 +305,8 @@ class HTMLWriter(Writer):
 
 
 class Write_setweight(object):
+    __slots__ = ( "output", "_weight", "_to_tsvector_writer", "_started", )
+
     def __init__(self, writer, weight):
         self.output = writer.output
 
@@ -149,6 +359,8 @@ class Write_setweight(object):
             return self._to_tsvector_writer.language
 
 class Write_tsvector(object):
+    __slots__ = ( "output", "_language", "_started", )
+
     def __init__(self, writer, language):
         self.output = writer.output
         self._language = language
@@ -177,8 +389,8 @@ class Write_tsvector(object):
 
 
 class TSearchWriter(Writer):
-    def __init__(self, output, root_language):
-        super().__init__(output, root_language)
+    def __init__(self, output, root_language, content_hash=None):
+        super().__init__(output, root_language, content_hash)
 
         self.setweight_writer = None
         self.language_stack = [ self.root_language, ]
@@ -213,7 +425,10 @@ class TSearchWriter(Writer):
         if language is None:
             language = self.root_language
 
-        if self.setweight_writer.language != language:
+        # Languages come from the context’s registry, so the identity
+        # check will usually decide this without calling __eq__().
+        current = self.setweight_writer.language
+        if current is not language and current != language:
             self.setweight_writer.tsvector_writer = Write_tsvector(
                 self, language)
 
@@ -256,3 +471,4 @@ class TSearchWriter(Writer):
 
     def end_document(self):
         self.finish_tsearch()
+        return super().end_document()